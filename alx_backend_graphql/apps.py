@@ -0,0 +1,19 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
+
+
+class GraphQLConfig(AppConfig):
+    name = "alx_backend_graphql"
+
+    def ready(self):
+        from crm.models import Product
+        from crm.signals import products_changed
+
+        from .response_cache import invalidate_responses_on_commit
+
+        # Cached allProducts responses go stale whenever product rows change
+        for signal in (post_save, post_delete, products_changed):
+            signal.connect(
+                invalidate_responses_on_commit, sender=Product,
+                dispatch_uid="graphql-response-cache-products",
+            )
@@ -0,0 +1,229 @@
+"""Static cost and depth analysis for GraphQL operations.
+
+Runs on the validated document before execution. Every object a query can
+return costs one unit; connection fields multiply their subtree by the page
+size the client asked for (``first``/``last``, default
+``GRAPHQL_DEFAULT_PAGE_SIZE``) and plain list fields by
+``GRAPHQL_LIST_FIELD_SIZE``. For example
+``allOrders(first: 50) { edges { node { id customer { name } } } }`` costs
+50 * (1 + 1 + 1 + 1) = 200.
+"""
+from django.conf import settings
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLObjectType,
+    InlineFragmentNode,
+    IntValueNode,
+    Visitor,
+    VariableNode,
+    get_named_type,
+    get_nullable_type,
+    is_composite_type,
+    visit,
+)
+
+PAGE_SIZE_ARGUMENTS = ("first", "last")
+
+
+class QueryCostError(GraphQLError):
+    """The operation is over the configured cost, depth or page size."""
+
+    def __init__(self, message, query_cost=None):
+        super().__init__(message, extensions={"code": "QUERY_TOO_COSTLY"})
+        self.query_cost = query_cost
+
+
+class QueryCost:
+    """Result of analyzing one operation."""
+
+    def __init__(self, cost, depth, clamped_arguments, clamped_variables):
+        self.cost = cost
+        self.depth = depth
+        # Page size arguments over the limit, by AST node id / variable name
+        self.clamped_arguments = clamped_arguments
+        self.clamped_variables = clamped_variables
+
+    def as_extension(self):
+        return {
+            "requestedCost": self.cost,
+            "maximumCost": get_cost_settings()["max_cost"],
+            "depth": self.depth,
+        }
+
+
+def get_cost_settings():
+    max_page_size = getattr(
+        settings, "GRAPHQL_MAX_PAGE_SIZE", graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+    )
+    return {
+        "max_cost": getattr(settings, "GRAPHQL_MAX_QUERY_COST", 10000),
+        "max_depth": getattr(settings, "GRAPHQL_MAX_QUERY_DEPTH", 12),
+        "max_page_size": max_page_size,
+        "default_page_size": getattr(settings, "GRAPHQL_DEFAULT_PAGE_SIZE", max_page_size),
+        "list_size": getattr(settings, "GRAPHQL_LIST_FIELD_SIZE", 10),
+        # "reject" oversize first/last values, or "clamp" them to max_page_size
+        "page_size_policy": getattr(settings, "GRAPHQL_PAGE_SIZE_POLICY", "reject"),
+    }
+
+
+def _is_connection(graphql_type):
+    return (
+        isinstance(graphql_type, GraphQLObjectType)
+        and "edges" in graphql_type.fields
+        and "pageInfo" in graphql_type.fields
+    )
+
+
+class CostAnalyzer:
+    def __init__(self, schema, document, operation, variables=None, options=None):
+        self.schema = schema
+        self.operation = operation
+        self.variables = variables or {}
+        self.options = options or get_cost_settings()
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if definition.kind == "fragment_definition"
+        }
+        self.variable_defaults = {
+            definition.variable.name.value: definition.default_value
+            for definition in operation.variable_definitions or ()
+        }
+        self.clamped_arguments = set()
+        self.clamped_variables = set()
+
+    def analyze(self):
+        root_type = self.schema.get_root_type(self.operation.operation)
+        cost, depth = self._selection_set(root_type, self.operation.selection_set, 0, False)
+        return QueryCost(cost, depth, self.clamped_arguments, self.clamped_variables)
+
+    def _fields(self, parent_type, selection_set, visited):
+        """Yield ``(parent_type, field_node)`` with fragments flattened."""
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield parent_type, selection
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition is not None:
+                    fragment_type = self.schema.get_type(selection.type_condition.name.value)
+                yield from self._fields(fragment_type, selection.selection_set, visited)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                if name in visited:
+                    continue
+                fragment = self.fragments[name]
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                yield from self._fields(fragment_type, fragment.selection_set, visited | {name})
+
+    def _selection_set(self, parent_type, selection_set, depth, in_connection):
+        total_cost = 0
+        max_depth = depth
+        for field_parent, field_node in self._fields(parent_type, selection_set, frozenset()):
+            name = field_node.name.value
+            if name.startswith("__"):
+                continue
+            field_def = field_parent.fields.get(name) if hasattr(field_parent, "fields") else None
+            if field_def is None:
+                continue
+
+            named_type = get_named_type(field_def.type)
+            if not is_composite_type(named_type) or field_node.selection_set is None:
+                max_depth = max(max_depth, depth + 1)
+                continue
+
+            if _is_connection(named_type):
+                multiplier = self._page_size(field_node)
+            elif isinstance(get_nullable_type(field_def.type), GraphQLList) and not in_connection:
+                multiplier = self.options["list_size"]
+            else:
+                multiplier = 1
+
+            child_cost, child_depth = self._selection_set(
+                named_type, field_node.selection_set, depth + 1, _is_connection(named_type)
+            )
+            total_cost += multiplier * (1 + child_cost)
+            max_depth = max(max_depth, child_depth)
+        return total_cost, max_depth
+
+    def _argument_value(self, argument):
+        value = argument.value
+        if isinstance(value, VariableNode):
+            name = value.name.value
+            if name in self.variables:
+                requested = self.variables[name]
+                return requested if isinstance(requested, int) else None
+            default = self.variable_defaults.get(name)
+            return int(default.value) if isinstance(default, IntValueNode) else None
+        if isinstance(value, IntValueNode):
+            return int(value.value)
+        return None
+
+    def _page_size(self, field_node):
+        max_page_size = self.options["max_page_size"]
+        page_size = None
+        for argument in field_node.arguments:
+            if argument.name.value not in PAGE_SIZE_ARGUMENTS:
+                continue
+            requested = self._argument_value(argument)
+            if requested is None:
+                continue
+            if max_page_size and requested > max_page_size:
+                if self.options["page_size_policy"] != "clamp":
+                    raise QueryCostError(
+                        f"Requesting {requested} records on `{field_node.name.value}` "
+                        f"exceeds the page size limit of {max_page_size}."
+                    )
+                if isinstance(argument.value, VariableNode):
+                    self.clamped_variables.add(argument.value.name.value)
+                else:
+                    self.clamped_arguments.add(id(argument))
+                requested = max_page_size
+            page_size = max(page_size or 0, requested)
+        return page_size if page_size is not None else self.options["default_page_size"]
+
+
+class _ClampVisitor(Visitor):
+    def __init__(self, arguments, limit):
+        super().__init__()
+        self.arguments = arguments
+        self.limit = limit
+
+    def enter_argument(self, node, *args):
+        if id(node) in self.arguments:
+            return node.__class__(name=node.name, value=IntValueNode(value=str(self.limit)))
+        return None
+
+
+def analyze_query_cost(schema, document, operation, variables=None):
+    """Analyze ``operation`` and enforce the configured limits.
+
+    Returns ``(query_cost, document, variables)`` where the document and
+    variables have oversize page sizes lowered when the policy is "clamp".
+    Raises ``QueryCostError`` when the operation is over budget.
+    """
+    options = get_cost_settings()
+    query_cost = CostAnalyzer(schema, document, operation, variables, options).analyze()
+
+    if query_cost.depth > options["max_depth"]:
+        raise QueryCostError(
+            f"Query depth {query_cost.depth} exceeds the maximum depth of {options['max_depth']}.",
+            query_cost,
+        )
+    if query_cost.cost > options["max_cost"]:
+        raise QueryCostError(
+            f"Query cost {query_cost.cost} exceeds the maximum cost of {options['max_cost']}.",
+            query_cost,
+        )
+
+    limit = options["max_page_size"]
+    if query_cost.clamped_arguments:
+        document = visit(document, _ClampVisitor(query_cost.clamped_arguments, limit))
+    if query_cost.clamped_variables:
+        variables = dict(variables)
+        for name in query_cost.clamped_variables:
+            variables[name] = limit
+    return query_cost, document, variables
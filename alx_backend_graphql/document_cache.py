@@ -0,0 +1,73 @@
+"""Size-bounded LRU caches for parsed and validated GraphQL documents."""
+import threading
+import weakref
+from collections import OrderedDict
+
+
+class DocumentCache:
+    """Thread-safe LRU mapping a key to a parsed and validated document."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                document = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return document
+
+    def set(self, key, document):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = document
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# One set of caches per GraphQL schema, dropped with the schema
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def get_document_cache(schema, name, max_entries):
+    """Return the ``name`` cache for ``schema``, creating it on first use."""
+    with _caches_lock:
+        caches = _caches.setdefault(schema, {})
+        if name not in caches:
+            caches[name] = DocumentCache(max_entries)
+        return caches[name]
+
+
+def document_cache_stats(schema):
+    """Return ``{name: stats}`` for every cache of ``schema``."""
+    with _caches_lock:
+        caches = dict(_caches.get(schema, {}))
+    return {name: cache.stats() for name, cache in caches.items()}
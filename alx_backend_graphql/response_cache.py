@@ -0,0 +1,199 @@
+"""Whole-response cache for read-mostly GraphQL queries.
+
+A query whose root fields are all listed in ``GRAPHQL_RESPONSE_CACHE_FIELDS``
+(by default just ``allProducts``) is answered from the cache when the same
+normalized document, operation name and variables were executed within
+``GRAPHQL_RESPONSE_CACHE_TTL`` seconds. Filter arguments are part of the
+document or the variables, so they are part of the key.
+
+Keys also carry a generation number; ``invalidate_responses()`` starts a new
+generation, which orphans every cached response at once without having to
+enumerate keys in a shared store. ``alx_backend_graphql.apps`` connects it to
+the ``Product`` save/delete signals and ``crm.signals.products_changed``.
+
+``GRAPHQL_RESPONSE_CACHE_BACKEND`` names the storage by dotted path:
+``LRUBackend`` keeps entries in this process, ``DjangoCacheBackend`` uses the
+``CACHES`` alias in ``GRAPHQL_RESPONSE_CACHE_ALIAS`` (e.g. Redis) so every
+process shares entries and invalidations.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+from graphql import FieldNode, InlineFragmentNode, OperationType, print_ast
+
+GENERATION_KEY = "graphql:response:generation"
+
+
+class LRUBackend:
+    """Size-bounded in-process store with per-entry expiry."""
+
+    def __init__(self, max_entries=None):
+        if max_entries is None:
+            max_entries = getattr(settings, "GRAPHQL_RESPONSE_CACHE_MAX_ENTRIES", 1000)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self):
+        return self._generation
+
+    def new_generation(self):
+        with self._lock:
+            self._generation += 1
+            # Nothing can hit the old entries any more
+            self._entries.clear()
+
+
+class DjangoCacheBackend:
+    """Store in a Django cache, shared by every process using the same alias."""
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or getattr(settings, "GRAPHQL_RESPONSE_CACHE_ALIAS", "default")]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, ttl):
+        self.cache.set(key, value, ttl)
+
+    def generation(self):
+        return self.cache.get_or_set(GENERATION_KEY, time.time_ns, timeout=None)
+
+    def new_generation(self):
+        # A timestamp rather than incr(): safe even if the key was evicted
+        self.cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+class ResponseCache:
+    """Response data by query key, with hit and miss counters."""
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, document, operation_name, variables):
+        payload = json.dumps(
+            [print_ast(document), operation_name, variables or {}],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"graphql:response:{self.backend.generation()}:{digest}"
+
+    def get(self, key):
+        data = self.backend.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, key, data):
+        self.backend.set(key, data, self.ttl)
+
+    def invalidate(self):
+        self.backend.new_generation()
+
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": self.hit_ratio(),
+        }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide ``ResponseCache``, creating it on first use."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            path = getattr(
+                settings,
+                "GRAPHQL_RESPONSE_CACHE_BACKEND",
+                "alx_backend_graphql.response_cache.LRUBackend",
+            )
+            _response_cache = ResponseCache(
+                import_string(path)(), getattr(settings, "GRAPHQL_RESPONSE_CACHE_TTL", 60)
+            )
+        return _response_cache
+
+
+def invalidate_responses():
+    get_response_cache().invalidate()
+
+
+def invalidate_responses_on_commit(sender, **kwargs):
+    """Signal receiver: invalidate once the current transaction commits."""
+    # After commit, so a concurrent read cannot cache the old rows again
+    transaction.on_commit(invalidate_responses)
+
+
+def response_cache_stats():
+    return get_response_cache().stats()
+
+
+def is_cacheable(operation):
+    """Whether every root field of a query operation is configured as cacheable."""
+    fields = set(getattr(settings, "GRAPHQL_RESPONSE_CACHE_FIELDS", ("allProducts",)))
+    if not fields or operation.operation != OperationType.QUERY:
+        return False
+
+    selected = False
+    selections = list(operation.selection_set.selections)
+    while selections:
+        selection = selections.pop()
+        if isinstance(selection, InlineFragmentNode):
+            selections.extend(selection.selection_set.selections)
+        elif isinstance(selection, FieldNode):
+            name = selection.name.value
+            if name == "__typename":
+                continue
+            if name not in fields:
+                return False
+            selected = True
+        else:
+            # Named fragments at the root are not inspected
+            return False
+    return selected
@@ -35,17 +35,13 @@ INSTALLED_APPS = [
     "graphene_django",
     "django_filters",
     "crm",
+    "alx_backend_graphql",
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-     "django_crontab",
-]
-
-CRONJOBS = [
-    ("*/5 * * * *", "crm.cron.log_crm_heartbeat"),
 ]
 
 MIDDLEWARE = [
@@ -64,6 +60,61 @@ GRAPHENE = {
     "SCHEMA": "alx_backend_graphql_crm.schema.schema",  # module.path.to.variable
 }
 
+# Parsed documents kept per schema for persisted query hashes
+GRAPHQL_PERSISTED_QUERIES_MAX_ENTRIES = 1000
+# Parsed documents kept per schema keyed by query text
+GRAPHQL_DOCUMENT_CACHE_MAX_ENTRIES = 500
+# Report the hit and miss counters of these caches in the `cacheStats` extension
+GRAPHQL_CACHE_STATS = DEBUG
+
+# Static query cost limits (see alx_backend_graphql/cost.py)
+GRAPHQL_MAX_QUERY_COST = 10000
+GRAPHQL_MAX_QUERY_DEPTH = 12
+GRAPHQL_MAX_PAGE_SIZE = 100
+GRAPHQL_LIST_FIELD_SIZE = 10
+GRAPHQL_PAGE_SIZE_POLICY = "reject"  # or "clamp" to lower oversize first/last
+
+# Whole-response cache for read-mostly queries (alx_backend_graphql.response_cache)
+GRAPHQL_RESPONSE_CACHE_FIELDS = ("allProducts",)  # root fields whose queries may be cached; () disables
+GRAPHQL_RESPONSE_CACHE_TTL = 60  # seconds
+GRAPHQL_RESPONSE_CACHE_BACKEND = "alx_backend_graphql.response_cache.LRUBackend"  # or .DjangoCacheBackend
+GRAPHQL_RESPONSE_CACHE_MAX_ENTRIES = 1000  # LRUBackend only
+GRAPHQL_RESPONSE_CACHE_ALIAS = "default"  # DjangoCacheBackend only
+
+# Resolver tracing (alx_backend_graphql.tracing)
+GRAPHQL_TRACE_HEADER = "X-GraphQL-Trace"  # send it to get the `tracing` extension
+GRAPHQL_TRACE_HEADER_ENABLED = DEBUG  # honour the header; keep off in production
+GRAPHQL_TRACE_SAMPLE_RATE = 0.0  # fraction of requests whose trace summary is logged
+GRAPHQL_TRACE_DUPLICATE_THRESHOLD = 3  # identical SQL this many times is flagged as N+1
+
+CACHES = {
+    # For a cache shared by all processes use e.g.
+    # "django.core.cache.backends.redis.RedisCache" with LOCATION "redis://localhost:6379/1"
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+
+# CRM tuning
+CRM_BULK_CREATE_CHUNK_SIZE = 1000  # rows per bulk_create/uniqueness probe
+CRM_GRAPHQL_TRANSPORT = "local"  # how jobs run GraphQL: "local" or "http"
+CRM_GRAPHQL_URL = "http://localhost:8000/graphql"  # used when transport is "http"
+CRM_GRAPHQL_SCHEMA_CACHE_TTL = 24 * 60 * 60  # introspection cache, used without crm/schema.graphql
+CRM_SEARCH_BACKEND = None  # dotted path to a crm.search backend; None picks one per database vendor
+CRM_EXPORT_CHUNK_SIZE = 2000  # orders per cursor fetch/product query in /export/orders
+CRM_CLEANUP_BATCH_SIZE = 1000  # customer ids per transaction in clean_inactive_customers
+CRM_REMINDER_WINDOW_DAYS = 7  # orders this recent get a reminder
+CRM_REMINDER_PAGE_SIZE = 1000  # orders per keyset page when collecting reminders
+CRM_REMINDER_BATCH_SIZE = 100  # emails per mail connection
+CRM_REMINDER_WORKERS = 4  # mail connections sending in parallel
+CRM_REMINDER_EMAIL_BACKEND = None  # e.g. "django.core.mail.backends.console.EmailBackend"; None uses EMAIL_BACKEND
+
+# Periodic jobs, run by `manage.py run_scheduler`: crm.scheduler.DEFAULT_JOBS unless CRM_SCHEDULER_JOBS is set
+CRM_SCHEDULER_JITTER = 30  # seconds; each run starts up to this long after its slot
+CRM_JOB_LOG_MAX_BYTES = 10 * 1024 * 1024  # a job log rotates to <path>.1 past this size
+CRM_JOB_LOG_BACKUP_COUNT = 5  # rotated files kept per job log
+CRM_JOB_LOG_JSON = False  # job logs as JSON lines instead of text
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
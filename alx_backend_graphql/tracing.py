@@ -0,0 +1,176 @@
+"""Per-resolver timing and SQL accounting for single GraphQL requests.
+
+Tracing is off by default and costs nothing then: the view only adds a
+``ResolverTracer`` to a request's middleware when
+
+* the request carries the ``GRAPHQL_TRACE_HEADER`` header and
+  ``GRAPHQL_TRACE_HEADER_ENABLED`` is on (it follows ``DEBUG``), in which case
+  the trace is returned in the ``tracing`` response extension, or
+* the request is picked by ``GRAPHQL_TRACE_SAMPLE_RATE``, in which case a
+  one-line JSON summary is logged to ``alx_backend_graphql.tracing``.
+
+Resolvers are aggregated by path with list indices folded into ``*``
+(``allOrders.edges.*.node.customer``), so a field resolved once per row shows
+up as one entry with its call count. Every SQL statement is charged to the
+resolver running when it executes. The same statement text executing
+``GRAPHQL_TRACE_DUPLICATE_THRESHOLD`` or more times is reported under
+``duplicateSql`` as a likely N+1.
+
+Only the synchronous view is traced: under ``AsyncCRMGraphQLView`` queries
+run on worker threads whose connections this cannot observe.
+"""
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from graphql.execution.middleware import MiddlewareManager
+
+logger = logging.getLogger(__name__)
+
+# SQL text is cut to this many characters in extensions and logs
+SQL_PREVIEW_LENGTH = 200
+
+
+def path_key(path):
+    """``allOrders.edges.*.node.customer`` for a graphql-core ``Path``."""
+    keys = []
+    while path is not None:
+        keys.append("*" if isinstance(path.key, int) else path.key)
+        path = path.prev
+    return ".".join(reversed(keys))
+
+
+class ResolverStats:
+    __slots__ = ("calls", "seconds", "sql_queries", "sql_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+
+
+class ResolverTracer:
+    """Graphene middleware recording one request's resolvers and SQL."""
+
+    def __init__(self, expose=False, log=False):
+        self.expose = expose
+        self.log = log
+        self.resolvers = defaultdict(ResolverStats)
+        self.statements = defaultdict(list)
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.started = None
+        self.duration = 0.0
+        self._current = None
+
+    @classmethod
+    def for_request(cls, request):
+        """A tracer if this request should be traced, else ``None``."""
+        header = getattr(settings, "GRAPHQL_TRACE_HEADER", "X-GraphQL-Trace")
+        expose = (
+            getattr(settings, "GRAPHQL_TRACE_HEADER_ENABLED", settings.DEBUG)
+            and bool(request.headers.get(header))
+        )
+        rate = getattr(settings, "GRAPHQL_TRACE_SAMPLE_RATE", 0.0)
+        log = rate > 0 and random.random() < rate
+        if not (expose or log):
+            return None
+        return cls(expose=expose, log=log)
+
+    def with_middleware(self, middleware):
+        """``middleware`` with this tracer appended, i.e. running closest to the resolver."""
+        if isinstance(middleware, MiddlewareManager):
+            middleware = middleware.middlewares
+        return [*(middleware or ()), self]
+
+    def resolve(self, next, root, info, **args):
+        key = path_key(info.path)
+        stats = self.resolvers[key]
+        previous, self._current = self._current, (key, stats)
+        started = time.perf_counter()
+        try:
+            return next(root, info, **args)
+        finally:
+            stats.calls += 1
+            stats.seconds += time.perf_counter() - started
+            self._current = previous
+
+    def execute_sql(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sql_queries += 1
+            self.sql_seconds += elapsed
+            path = None
+            if self._current is not None:
+                path, stats = self._current
+                stats.sql_queries += 1
+                stats.sql_seconds += elapsed
+            self.statements[sql].append(path)
+
+    @contextmanager
+    def capture(self):
+        """Record the SQL of the default connection while executing."""
+        self.started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(self.execute_sql):
+                yield self
+        finally:
+            self.duration = time.perf_counter() - self.started
+
+    def duplicates(self):
+        threshold = getattr(settings, "GRAPHQL_TRACE_DUPLICATE_THRESHOLD", 3)
+        found = [
+            {
+                "sql": sql[:SQL_PREVIEW_LENGTH],
+                "count": len(paths),
+                "paths": sorted({path or "(outside resolvers)" for path in paths}),
+            }
+            for sql, paths in self.statements.items()
+            if len(paths) >= threshold
+        ]
+        return sorted(found, key=lambda entry: -entry["count"])
+
+    def resolver_rows(self):
+        rows = [
+            {
+                "path": path,
+                "calls": stats.calls,
+                "durationMs": round(stats.seconds * 1000, 3),
+                "sqlQueries": stats.sql_queries,
+                "sqlMs": round(stats.sql_seconds * 1000, 3),
+            }
+            for path, stats in self.resolvers.items()
+        ]
+        return sorted(rows, key=lambda row: -row["durationMs"])
+
+    def as_extension(self):
+        return {
+            "durationMs": round(self.duration * 1000, 3),
+            "sqlQueries": self.sql_queries,
+            "sqlMs": round(self.sql_seconds * 1000, 3),
+            "resolvers": self.resolver_rows(),
+            "duplicateSql": self.duplicates(),
+        }
+
+    def write_log(self, operation_name):
+        summary = {
+            "event": "graphql.trace",
+            "operation": operation_name,
+            "durationMs": round(self.duration * 1000, 3),
+            "sqlQueries": self.sql_queries,
+            "sqlMs": round(self.sql_seconds * 1000, 3),
+            "slowestResolvers": self.resolver_rows()[:5],
+            "duplicateSql": [
+                {"sql": entry["sql"], "count": entry["count"]} for entry in self.duplicates()
+            ],
+        }
+        logger.info(json.dumps(summary, default=str))
@@ -16,10 +16,16 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
 
+from crm.views import export_orders
+
+from .views import AsyncCRMGraphQLView, CRMGraphQLView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path("graphql", csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path("graphql", csrf_exempt(CRMGraphQLView.as_view(graphiql=True))),
+    # Same schema with concurrent resolvers; serve it from an ASGI server
+    path("graphql/async", AsyncCRMGraphQLView.as_view(graphiql=True)),
+    path("export/orders", export_orders),
 ]
@@ -0,0 +1,433 @@
+"""GraphQL endpoint for the CRM schema.
+
+Extends graphene-django's ``GraphQLView`` with automatic persisted queries
+(APQ): clients may send only the sha256 of a document they registered
+before, and the parsed and validated AST is reused from an LRU instead of
+being parsed and validated again::
+
+    {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": "<hex>"}}}
+
+An unknown hash answers ``PersistedQueryNotFound``; the client then resends
+the hash together with the query text, which registers it.
+
+Plain query text goes through a second LRU keyed by the text itself, so the
+same document sent over and over is parsed and validated only once. Both
+caches are sized by settings; with ``GRAPHQL_CACHE_STATS`` on, every
+response reports their entries, hits and misses, and those of the response
+cache, in the ``cacheStats`` extension.
+
+Before execution every operation is priced by ``alx_backend_graphql.cost``;
+operations over the configured cost, depth or page size are rejected (or
+have their page sizes clamped) and the computed cost is returned in the
+response ``extensions``.
+
+Queries that only select fields listed in ``GRAPHQL_RESPONSE_CACHE_FIELDS``
+are answered from ``alx_backend_graphql.response_cache`` when possible; the
+``responseCache`` extension reports whether it was a hit and the hit ratio.
+
+Requests sent with the ``X-GraphQL-Trace`` header (when enabled) get a
+per-resolver timing and SQL breakdown in the ``tracing`` extension; see
+``alx_backend_graphql.tracing``.
+
+``AsyncCRMGraphQLView`` serves the same schema under ASGI, resolving
+independent fields of a query concurrently.
+"""
+import hashlib
+import json
+from contextlib import nullcontext
+from inspect import isawaitable
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.http.response import HttpResponseBadRequest
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult,
+    GraphQLError,
+    OperationType,
+    execute,
+    get_operation_ast,
+    parse,
+    validate,
+    validate_schema,
+)
+
+from .cost import QueryCostError, analyze_query_cost
+from .document_cache import document_cache_stats, get_document_cache
+from .response_cache import get_response_cache, is_cacheable, response_cache_stats
+from .tracing import ResolverTracer
+
+PERSISTED_QUERY_VERSION = 1
+
+
+class PreparedRequest:
+    """A validated, priced operation that is ready to execute."""
+
+    def __init__(self, document, operation_ast, variables, operation_name, extensions,
+                 response_cache=None, cache_key=None):
+        self.document = document
+        self.operation_ast = operation_ast
+        self.variables = variables
+        self.operation_name = operation_name
+        self.extensions = extensions
+        self.response_cache = response_cache
+        self.cache_key = cache_key
+
+
+class CRMGraphQLView(GraphQLView):
+    """``GraphQLView`` with persisted queries, document caching and cost limits."""
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        return self.format_response(request, id, execution_result, show_graphiql)
+
+    def format_response(self, request, id, execution_result, show_graphiql=False):
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        status_code = 200
+        if execution_result:
+            if getattr(settings, "GRAPHQL_CACHE_STATS", False):
+                execution_result.extensions = dict(
+                    execution_result.extensions or {}, cacheStats=self.get_cache_stats()
+                )
+            response = {}
+
+            if execution_result.errors:
+                set_rollback()
+                response["errors"] = [
+                    self.format_error(e) for e in execution_result.errors
+                ]
+
+            if execution_result.errors and any(
+                not getattr(e, "path", None) for e in execution_result.errors
+            ):
+                status_code = 400
+            else:
+                response["data"] = execution_result.data
+
+            if execution_result.extensions:
+                response["extensions"] = execution_result.extensions
+
+            if self.batch:
+                response["id"] = id
+                response["status"] = status_code
+
+            result = self.json_encode(request, response, pretty=show_graphiql)
+        else:
+            result = None
+
+        return result, status_code
+
+    def get_cache_stats(self):
+        """Counters of this process's caches, for the ``cacheStats`` extension."""
+        return dict(document_cache_stats(self.schema.graphql_schema), responses=response_cache_stats())
+
+    def get_persisted_queries(self):
+        max_entries = getattr(settings, "GRAPHQL_PERSISTED_QUERIES_MAX_ENTRIES", 1000)
+        return get_document_cache(self.schema.graphql_schema, "persisted", max_entries)
+
+    @staticmethod
+    def get_extensions(request, data):
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if extensions and isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        return extensions or {}
+
+    def get_persisted_query_hash(self, request, data):
+        persisted_query = self.get_extensions(request, data).get("persistedQuery")
+        if not persisted_query:
+            return None
+        if persisted_query.get("version") != PERSISTED_QUERY_VERSION:
+            raise GraphQLError(
+                "Unsupported persisted query version",
+                extensions={"code": "PERSISTED_QUERY_NOT_SUPPORTED"},
+            )
+        query_hash = persisted_query.get("sha256Hash")
+        if not isinstance(query_hash, str):
+            raise GraphQLError("Persisted query is missing sha256Hash")
+        return query_hash.lower()
+
+    def get_document_cache(self):
+        max_entries = getattr(settings, "GRAPHQL_DOCUMENT_CACHE_MAX_ENTRIES", 500)
+        return get_document_cache(self.schema.graphql_schema, "documents", max_entries)
+
+    def parse_and_validate(self, query):
+        """Return ``(document, errors)`` for the query text.
+
+        Only valid documents are cached, so a broken query is re-checked (and
+        reported) every time it is sent.
+        """
+        documents = self.get_document_cache()
+        document = documents.get(query)
+        if document is not None:
+            return document, []
+
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            return None, [e]
+
+        validation_errors = validate(
+            self.schema.graphql_schema,
+            document,
+            self.validation_rules,
+            graphene_settings.MAX_VALIDATION_ERRORS,
+        )
+        if not validation_errors:
+            documents.set(query, document)
+        return document, validation_errors
+
+    def get_document(self, request, data, query):
+        """Return ``(document, errors)``, consulting the persisted queries."""
+        query_hash = self.get_persisted_query_hash(request, data)
+        if query_hash is None:
+            return self.parse_and_validate(query)
+
+        if query and hashlib.sha256(query.encode("utf-8")).hexdigest() != query_hash:
+            raise GraphQLError("provided sha does not match query")
+
+        persisted = self.get_persisted_queries()
+        document = persisted.get(query_hash)
+        if document is not None:
+            return document, []
+
+        if not query:
+            raise GraphQLError(
+                "PersistedQueryNotFound",
+                extensions={"code": "PERSISTED_QUERY_NOT_FOUND"},
+            )
+
+        document, errors = self.parse_and_validate(query)
+        if not errors:
+            persisted.set(query_hash, document)
+        return document, errors
+
+    def prepare_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        """Everything before execution: documents, cost limits, response cache.
+
+        Returns a ``PreparedRequest``, or the final ``ExecutionResult`` (or
+        ``None`` for GraphiQL) when there is nothing left to execute.
+        """
+        if not query and not self.get_extensions(request, data).get("persistedQuery"):
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        try:
+            document, validation_errors = self.get_document(request, data, query)
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
+        if validation_errors:
+            return ExecutionResult(data=None, errors=validation_errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        extensions = {}
+        if operation_ast is not None:
+            try:
+                query_cost, document, variables = analyze_query_cost(
+                    schema, document, operation_ast, variables
+                )
+            except QueryCostError as e:
+                if e.query_cost is not None:
+                    extensions["cost"] = e.query_cost.as_extension()
+                return ExecutionResult(errors=[e], extensions=extensions or None)
+            extensions["cost"] = query_cost.as_extension()
+
+        response_cache = cache_key = None
+        if operation_ast is not None and is_cacheable(operation_ast):
+            response_cache = get_response_cache()
+            cache_key = response_cache.key(document, operation_name, variables)
+            data = response_cache.get(cache_key)
+            extensions["responseCache"] = {
+                "hit": data is not None,
+                "hitRatio": round(response_cache.hit_ratio(), 4),
+            }
+            if data is not None:
+                return ExecutionResult(data=data, extensions=extensions)
+
+        return PreparedRequest(
+            document, operation_ast, variables, operation_name, extensions,
+            response_cache, cache_key,
+        )
+
+    def get_execute_options(self, request, prepared):
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": prepared.variables,
+            "operation_name": prepared.operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+        return execute_options
+
+    def execute_prepared(self, request, prepared):
+        schema = self.schema.graphql_schema
+        operation_ast = prepared.operation_ast
+        tracer = ResolverTracer.for_request(request)
+        try:
+            execute_options = self.get_execute_options(request, prepared)
+            if tracer is not None:
+                execute_options["middleware"] = tracer.with_middleware(execute_options["middleware"])
+            with tracer.capture() if tracer is not None else nullcontext():
+                if (
+                    operation_ast is not None
+                    and operation_ast.operation == OperationType.MUTATION
+                    and (
+                        graphene_settings.ATOMIC_MUTATIONS is True
+                        or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                    )
+                ):
+                    with transaction.atomic():
+                        result = execute(schema, prepared.document, **execute_options)
+                        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                            transaction.set_rollback(True)
+                else:
+                    result = execute(schema, prepared.document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e], extensions=prepared.extensions or None)
+        return self.finish_graphql_request(prepared, result, tracer)
+
+    def finish_graphql_request(self, prepared, result, tracer=None):
+        if prepared.cache_key is not None and not result.errors:
+            prepared.response_cache.set(prepared.cache_key, result.data)
+
+        if tracer is not None:
+            if tracer.expose:
+                prepared.extensions["tracing"] = tracer.as_extension()
+            if tracer.log:
+                tracer.write_log(prepared.operation_name)
+
+        if prepared.extensions:
+            result.extensions = dict(result.extensions or {}, **prepared.extensions)
+        return result
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        prepared = self.prepare_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        if not isinstance(prepared, PreparedRequest):
+            return prepared
+        return self.execute_prepared(request, prepared)
+
+
+class AsyncCRMGraphQLView(CRMGraphQLView):
+    """``CRMGraphQLView`` for ASGI servers.
+
+    Queries execute on the event loop: root list fields run their SQL in
+    worker threads concurrently, and nested fields resolve through the
+    request's loaders, which batch every key requested in the same tick.
+    Mutations keep the synchronous, transactional path in a worker thread.
+    Parsing, validation, pricing and the response cache are shared with
+    ``CRMGraphQLView``.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        markcoroutinefunction(view)
+        # csrf_exempt() only preserves async views from Django 5.0 on
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["GET", "POST"], "GraphQL only supports GET and POST requests."
+                    )
+                )
+
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+            if self.batch:
+                responses = [await self.get_response_async(request, entry) for entry in data]
+                result = "[{}]".format(",".join(response[0] for response in responses))
+                status_code = max((response[1] for response in responses), default=200)
+            else:
+                result, status_code = await self.get_response_async(request, data)
+
+            return HttpResponse(status=status_code, content=result, content_type="application/json")
+
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+            return response
+
+    async def get_response_async(self, request, data):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = await self.execute_graphql_request_async(
+            request, data, query, variables, operation_name
+        )
+        return self.format_response(request, id, execution_result)
+
+    async def execute_graphql_request_async(self, request, data, query, variables, operation_name):
+        prepared = await sync_to_async(self.prepare_graphql_request)(
+            request, data, query, variables, operation_name
+        )
+        if not isinstance(prepared, PreparedRequest):
+            return prepared
+
+        operation_ast = prepared.operation_ast
+        if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            return await sync_to_async(self.execute_prepared)(request, prepared)
+
+        try:
+            result = execute(
+                self.schema.graphql_schema,
+                prepared.document,
+                **self.get_execute_options(request, prepared),
+            )
+            if isawaitable(result):
+                result = await result
+        except Exception as e:
+            return ExecutionResult(errors=[e], extensions=prepared.extensions or None)
+        return await sync_to_async(self.finish_graphql_request)(prepared, result)
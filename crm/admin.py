@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Customer, Product, Order
+from .models import Customer, Product, Order, OrderItem, JobCursor
 
 admin.site.register(Customer)
 admin.site.register(Product)
 admin.site.register(Order)
+admin.site.register(OrderItem)
+admin.site.register(JobCursor)
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def repair_search_indexes(sender, using, **kwargs):
+    from .search import repair_search_indexes
+
+    repair_search_indexes(connections[using])
 
 
 class CrmConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'crm'
+
+    def ready(self):
+        post_migrate.connect(repair_search_indexes, sender=self)
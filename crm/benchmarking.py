@@ -0,0 +1,7 @@
+"""Helpers shared by the ``benchmark_graphql`` and ``graphql_loadtest`` commands."""
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of sorted ``samples``."""
+    index = max(0, min(len(samples) - 1, round(fraction * len(samples)) - 1))
+    return samples[index]
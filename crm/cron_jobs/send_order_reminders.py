@@ -1,38 +1,29 @@
 #!/usr/bin/env python3
-import datetime
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+import os
+import sys
+from pathlib import Path
 
-# GraphQL endpoint
-transport = RequestsHTTPTransport(
-    url="http://localhost:8000/graphql",
-    verify=False,
-    retries=3,
-)
+import django
 
-client = Client(transport=transport, fetch_schema_from_transport=True)
+# Load Django so the reminders can run in-process
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "crm.settings")
+django.setup()
 
-# Date 7 days ago
-seven_days_ago = (datetime.datetime.now() - datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+from crm.joblog import JobLog  # noqa: E402
+from crm.reminders import send_order_reminders  # noqa: E402
 
-# GraphQL query
-query = gql("""
-    query GetRecentOrders($date: Date!) {
-        orders(orderDate_Gte: $date) {
-            id
-            customer {
-                email
-            }
-        }
-    }
-""")
+REMINDER_LOG = JobLog("order_reminders", "/tmp/order_reminders_log.txt", separator=" ")
 
-params = {"date": seven_days_ago}
-result = client.execute(query, variable_values=params)
+# One email per customer with new orders since the last run
+summary = send_order_reminders()
 
 # Logging
-with open("/tmp/order_reminders_log.txt", "a") as log_file:
-    for order in result["orders"]:
-        log_file.write(f"{datetime.datetime.now()} Order ID: {order['id']}, Email: {order['customer']['email']}\n")
+REMINDER_LOG.write(
+    f"Reminded {summary['sent']} customers about {summary['orders']} orders "
+    f"({summary['failed']} failed, up to order {summary['position']})",
+    **summary,
+)
+REMINDER_LOG.flush()
 
 print("Order reminders processed!")
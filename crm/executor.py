@@ -0,0 +1,180 @@
+"""Run GraphQL documents for the CRM jobs, in-process or over HTTP.
+
+Cron and Celery jobs speak the same GraphQL as external clients. By default
+they execute it directly against the schema the /graphql view serves, so a
+run costs no introspection query, no HTTP hop and no web worker. Set
+``CRM_GRAPHQL_TRANSPORT = "http"`` to send them to ``CRM_GRAPHQL_URL`` instead.
+
+Job documents are wrapped in ``JobDocument`` at module level so they are
+parsed once per process and checked against ``crm/schema.graphql`` at import.
+Regenerate that file after schema changes with::
+
+    python manage.py graphql_schema --schema alx_backend_graphql.schema.schema \
+        --out crm/schema.graphql
+"""
+import functools
+import json
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.conf import settings
+from graphql import build_schema, execute_sync, parse, validate
+
+DEFAULT_GRAPHQL_URL = "http://localhost:8000/graphql"
+
+# Checked-in SDL of the served schema
+SCHEMA_SDL_PATH = Path(__file__).resolve().parent / "schema.graphql"
+
+# Where the introspection result is cached when there is no SDL file
+DEFAULT_SCHEMA_CACHE_PATH = Path(tempfile.gettempdir()) / "crm_graphql_introspection.json"
+DEFAULT_SCHEMA_CACHE_TTL = 24 * 60 * 60
+
+
+class GraphQLExecutionError(Exception):
+    """The document executed but the result carries errors."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(str(error) for error in errors))
+
+
+@functools.lru_cache(maxsize=None)
+def checked_in_schema():
+    """The schema built from ``crm/schema.graphql``, or None without one."""
+    if not SCHEMA_SDL_PATH.exists():
+        return None
+    return build_schema(SCHEMA_SDL_PATH.read_text())
+
+
+class JobDocument:
+    """A job's GraphQL document, parsed and validated once per process."""
+
+    def __init__(self, source):
+        self.source = source
+        self.document = parse(source)
+        self._validated_against = None
+
+        schema = checked_in_schema()
+        if schema is not None:
+            self.validate(schema)
+
+    def validate(self, graphql_schema):
+        if self._validated_against is graphql_schema:
+            return
+        errors = validate(graphql_schema, self.document)
+        if errors:
+            raise GraphQLExecutionError(errors)
+        self._validated_against = graphql_schema
+
+
+def _as_job_document(query):
+    return query if isinstance(query, JobDocument) else JobDocument(query)
+
+
+class LocalExecutor:
+    """Execute documents against the graphene schema in this process."""
+
+    def __init__(self, schema=None):
+        self._schema = schema
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            from graphene_django.settings import graphene_settings
+
+            self._schema = graphene_settings.SCHEMA
+        return self._schema
+
+    def execute(self, query, variable_values=None):
+        graphql_schema = self.schema.graphql_schema
+        job_document = _as_job_document(query)
+        job_document.validate(graphql_schema)
+
+        result = execute_sync(
+            graphql_schema,
+            job_document.document,
+            context_value=SimpleNamespace(),
+            variable_values=variable_values,
+        )
+        if result.errors:
+            raise GraphQLExecutionError(result.errors)
+        return result.data
+
+
+def _load_cached_introspection(path, ttl):
+    try:
+        if time.time() - path.stat().st_mtime > ttl:
+            return None
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _store_cached_introspection(path, introspection):
+    try:
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(introspection))
+        tmp_path.replace(path)
+    except OSError:
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def get_http_session(url, retries=3):
+    """Return the process-wide gql session for ``url``.
+
+    The session keeps one pooled ``requests.Session`` open, and the schema
+    comes from ``crm/schema.graphql`` or from an introspection result cached
+    on disk for ``CRM_GRAPHQL_SCHEMA_CACHE_TTL`` seconds, so a job run costs
+    one POST rather than an introspection round trip.
+    """
+    from gql import Client
+    from gql.transport.requests import RequestsHTTPTransport
+
+    transport = RequestsHTTPTransport(url=url, verify=False, retries=retries)
+    cache_path = Path(getattr(settings, "CRM_GRAPHQL_SCHEMA_CACHE", DEFAULT_SCHEMA_CACHE_PATH))
+    cache_ttl = getattr(settings, "CRM_GRAPHQL_SCHEMA_CACHE_TTL", DEFAULT_SCHEMA_CACHE_TTL)
+
+    if SCHEMA_SDL_PATH.exists():
+        client = Client(transport=transport, schema=SCHEMA_SDL_PATH.read_text())
+        return client.connect_sync()
+
+    introspection = _load_cached_introspection(cache_path, cache_ttl)
+    if introspection is not None:
+        client = Client(transport=transport, introspection=introspection)
+        return client.connect_sync()
+
+    client = Client(transport=transport, fetch_schema_from_transport=True)
+    session = client.connect_sync()
+    _store_cached_introspection(cache_path, client.introspection)
+    return session
+
+
+class HTTPExecutor:
+    """Send documents to a running GraphQL endpoint with gql."""
+
+    def __init__(self, url=DEFAULT_GRAPHQL_URL, retries=3):
+        self.url = url
+        self.retries = retries
+
+    def execute(self, query, variable_values=None):
+        session = get_http_session(self.url, self.retries)
+        document = _as_job_document(query).document
+        try:
+            from gql import GraphQLRequest
+        except ImportError:
+            # gql < 4 takes the variables alongside the document
+            return session.execute(document, variable_values=variable_values)
+        return session.execute(GraphQLRequest(document, variable_values=variable_values))
+
+
+def get_executor():
+    """Return the executor selected by ``CRM_GRAPHQL_TRANSPORT``."""
+    transport = getattr(settings, "CRM_GRAPHQL_TRANSPORT", "local")
+    if transport == "local":
+        return LocalExecutor()
+    if transport == "http":
+        return HTTPExecutor(url=getattr(settings, "CRM_GRAPHQL_URL", DEFAULT_GRAPHQL_URL))
+    raise ValueError(f"Unknown CRM_GRAPHQL_TRANSPORT: {transport!r}")
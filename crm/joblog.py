@@ -0,0 +1,147 @@
+"""Append-only job logs, written in batches by a background thread.
+
+The cron and Celery jobs each keep a log file under ``/tmp``. A ``JobLog``
+only queues what a job writes; one writer thread per log drains the queue
+and writes everything queued so far with a single ``write`` and flush, so a
+restock of 100k products costs one queued record instead of 100k appends::
+
+    LOW_STOCK_LOG = JobLog("low_stock", "/tmp/low_stock_updates_log.txt")
+    LOW_STOCK_LOG.write("3 products restocked", lines=["Widget -> 20", ...], updated=3)
+
+A log rotates like ``logging.handlers.RotatingFileHandler``: once it would
+grow past ``CRM_JOB_LOG_MAX_BYTES`` it is renamed to ``<path>.1`` (older
+files shift up to ``CRM_JOB_LOG_BACKUP_COUNT``). With ``CRM_JOB_LOG_JSON``
+each record is one JSON object per line, with the keyword fields of
+``write`` as keys, instead of ``<time><separator><message>`` text.
+
+Queued records are written at interpreter exit, and ``flush()`` waits for
+them, so short-lived scripts lose nothing.
+"""
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Records written per batch at most, so rotation is checked regularly
+MAX_BATCH = 1000
+
+_logs = []
+_logs_lock = threading.Lock()
+
+
+class JobLog:
+    def __init__(self, name, path, time_format="%Y-%m-%d %H:%M:%S", separator=" - "):
+        self.name = name
+        self.path = path
+        self.time_format = time_format
+        self.separator = separator
+        self._queue = None
+        self._writer = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def write(self, message, lines=(), **fields):
+        """Queue ``message`` and its indented ``lines``; never blocks on the file."""
+        if self._pid != os.getpid():
+            self._start()
+        self._queue.put((datetime.datetime.now(), message, lines, fields))
+
+    def flush(self):
+        """Wait until everything queued so far is on disk."""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        if self._pid == os.getpid() and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._pid = None
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Settings are read here so tests can override them per log
+            self.max_bytes = getattr(settings, "CRM_JOB_LOG_MAX_BYTES", 10 * 1024 * 1024)
+            self.backup_count = getattr(settings, "CRM_JOB_LOG_BACKUP_COUNT", 5)
+            self.json_lines = getattr(settings, "CRM_JOB_LOG_JSON", False)
+            # A forked child gets a copy of the queue but not the thread
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(
+                target=self._run, name=f"joblog-{self.name}", daemon=True
+            )
+            self._writer.start()
+            self._pid = os.getpid()
+        with _logs_lock:
+            if self not in _logs:
+                _logs.append(self)
+
+    def format(self, moment, message, lines, fields):
+        if self.json_lines:
+            record = {"time": moment.isoformat(timespec="seconds"), "job": self.name,
+                      "message": message, **fields}
+            if lines:
+                record["lines"] = list(lines)
+            return json.dumps(record, default=str) + "\n"
+        text = f"{moment.strftime(self.time_format)}{self.separator}{message}\n"
+        if lines:
+            text += "".join(f"    {line}\n" for line in lines)
+        return text
+
+    def _run(self):
+        stream = None
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not None]
+            stopping = len(records) < len(batch)
+            try:
+                data = "".join(self.format(*record) for record in records)
+                if data:
+                    stream = self._rotate_if_full(stream, len(data.encode()))
+                    stream.write(data)
+                    stream.flush()
+            except Exception:
+                logger.exception("Could not write %d records to %s", len(records), self.path)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        if stream is not None:
+            stream.close()
+
+    def _rotate_if_full(self, stream, incoming):
+        if stream is None:
+            stream = open(self.path, "a", encoding="utf-8")
+        size = stream.tell()
+        if not (self.max_bytes and size and size + incoming > self.max_bytes):
+            return stream
+        stream.close()
+        if self.backup_count:
+            for index in range(self.backup_count - 1, 0, -1):
+                older = f"{self.path}.{index}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        return open(self.path, "a", encoding="utf-8")
+
+
+@atexit.register
+def close_all():
+    with _logs_lock:
+        logs = list(_logs)
+    for log in logs:
+        log.close()
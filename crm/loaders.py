@@ -0,0 +1,305 @@
+"""Request-scoped batch loaders for the CRM GraphQL types.
+
+Resolvers run synchronously, so a loader cannot wait for its siblings to ask
+for their keys. Instead whoever produces a list of parent objects (a
+connection page, another loader) primes the loaders with the keys the
+children will need, and the first ``load`` fetches every pending key in one
+``IN (...)`` query.
+
+Under an event loop (``AsyncCRMGraphQLView``) the same resolvers return
+awaitables instead: ``load`` queues its key and the first awaiter fetches
+every queued key with Django's async ORM, and connection fields run in
+worker threads of their own so sibling root fields query concurrently.
+"""
+import asyncio
+import inspect
+from collections import defaultdict
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from graphene_django.filter import DjangoFilterConnectionField
+
+from .models import Customer, Order, OrderItem
+from .optimizer import optimize_queryset
+
+
+def in_event_loop():
+    """Whether the caller runs on an event loop, i.e. must not block on the DB."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def concurrent_when_async(resolver):
+    """Run ``resolver`` as is, or in a worker thread of its own under an event loop.
+
+    Each thread has its own database connection, so sibling root fields
+    (``allCustomers`` and ``allOrders`` in one document) run their queries
+    at the same time instead of one after the other.
+    """
+    @wraps(resolver)
+    def wrapper(root, info, **args):
+        if not in_event_loop():
+            return resolver(root, info, **args)
+
+        def run():
+            close_old_connections()
+            try:
+                return resolver(root, info, **args)
+            finally:
+                close_old_connections()
+
+        return sync_to_async(run, thread_sensitive=False)()
+    return wrapper
+
+
+class DataLoader:
+    """Cache values by key and fetch all pending keys in a single batch."""
+
+    # Value returned for keys the batch did not find
+    default = None
+
+    def __init__(self, loaders):
+        self.loaders = loaders
+        self._cache = {}
+        self._pending = set()
+        # Futures of async batches in flight, by key
+        self._inflight = {}
+
+    def batch_load(self, keys):
+        """Return a dict mapping the given keys to their values."""
+        raise NotImplementedError
+
+    async def abatch_load(self, keys):
+        """Async ``batch_load``; override with Django's async ORM methods."""
+        return await sync_to_async(self.batch_load)(keys)
+
+    def prime(self, keys):
+        """Queue keys so they are fetched with the next batch."""
+        self._pending.update(
+            key for key in keys if key not in self._cache and key not in self._inflight
+        )
+
+    def set(self, key, value):
+        """Seed the cache with a value that is already known."""
+        self._cache[key] = value
+        self._pending.discard(key)
+
+    def load(self, key):
+        """Return the value, or an awaitable of it when called on an event loop."""
+        if key in self._cache:
+            return self._cache[key]
+        if in_event_loop():
+            if key not in self._inflight:
+                self._pending.add(key)
+            return self._load_async(key)
+        self._pending.add(key)
+        self._dispatch()
+        return self._cache[key]
+
+    async def load_many_async(self, keys):
+        keys = list(keys)
+        self.prime(keys)
+        values = [self.load(key) for key in keys]
+        return [await value if inspect.isawaitable(value) else value for value in values]
+
+    async def _load_async(self, key):
+        # Resolvers of a whole list queue their keys before the first of
+        # them gets here, so this dispatches one batch for all of them
+        if key not in self._cache and key not in self._inflight:
+            self._pending.add(key)
+            keys = list(self._pending)
+            self._pending.clear()
+            future = asyncio.ensure_future(self._dispatch_async(keys))
+            for pending_key in keys:
+                self._inflight[pending_key] = future
+        if key in self._inflight:
+            await self._inflight[key]
+        return self._cache[key]
+
+    async def _dispatch_async(self, keys):
+        try:
+            values = await self.abatch_load(keys)
+            for key in keys:
+                self._cache[key] = values.get(key, self.default)
+        finally:
+            for key in keys:
+                self._inflight.pop(key, None)
+
+    def load_many(self, keys):
+        keys = list(keys)
+        self.prime(keys)
+        if self._pending:
+            self._dispatch()
+        return [self._cache[key] for key in keys]
+
+    def _dispatch(self):
+        keys = list(self._pending)
+        self._pending.clear()
+        values = self.batch_load(keys)
+        for key in keys:
+            self._cache[key] = values.get(key, self.default)
+
+
+class CustomerLoader(DataLoader):
+    """Customer by customer id."""
+
+    def batch_load(self, keys):
+        return {customer.id: customer for customer in Customer.objects.filter(id__in=keys)}
+
+    async def abatch_load(self, keys):
+        return {customer.id: customer async for customer in Customer.objects.filter(id__in=keys)}
+
+
+class CustomerOrdersLoader(DataLoader):
+    """Orders by customer id."""
+
+    default = ()
+
+    def queryset(self, keys):
+        return Order.objects.filter(customer_id__in=keys).order_by("id")
+
+    def batch_load(self, keys):
+        return self.group(list(self.queryset(keys)))
+
+    async def abatch_load(self, keys):
+        return self.group([order async for order in self.queryset(keys)])
+
+    def group(self, orders):
+        grouped = defaultdict(list)
+        for order in orders:
+            grouped[order.customer_id].append(order)
+        # The next level down (order -> customer/products) batches as well
+        self.loaders.prime_orders(orders)
+        return grouped
+
+
+class OrderItemsLoader(DataLoader):
+    """Line items, with their product, by order id."""
+
+    default = ()
+
+    def queryset(self, keys):
+        return OrderItem.objects.filter(order_id__in=keys).select_related("product").order_by("id")
+
+    def batch_load(self, keys):
+        return self.group(self.queryset(keys))
+
+    async def abatch_load(self, keys):
+        return self.group([item async for item in self.queryset(keys)])
+
+    @staticmethod
+    def group(items):
+        grouped = defaultdict(list)
+        for item in items:
+            grouped[item.order_id].append(item)
+        return grouped
+
+
+class OrderProductsLoader(DataLoader):
+    """Products by order id, taken from the order's line items.
+
+    Ordered by product id, like the ``products`` prefetch of ``crm.optimizer``.
+    """
+
+    default = ()
+
+    def batch_load(self, keys):
+        return self.products(keys, self.loaders.order_items.load_many(keys))
+
+    async def abatch_load(self, keys):
+        return self.products(keys, await self.loaders.order_items.load_many_async(keys))
+
+    @classmethod
+    def products(cls, keys, items):
+        return {key: cls.products_of(order_items) for key, order_items in zip(keys, items)}
+
+    @staticmethod
+    def products_of(items):
+        return sorted((item.product for item in items), key=lambda product: product.pk)
+
+
+class Loaders:
+    """The set of loaders shared by every resolver of one request."""
+
+    def __init__(self):
+        self.customer = CustomerLoader(self)
+        self.customer_orders = CustomerOrdersLoader(self)
+        self.order_items = OrderItemsLoader(self)
+        self.order_products = OrderProductsLoader(self)
+
+    def prime_customers(self, customers):
+        for customer in customers:
+            self.customer.set(customer.id, customer)
+        self.customer_orders.prime(customer.id for customer in customers)
+
+    def prime_orders(self, orders):
+        self.customer.prime(order.customer_id for order in orders)
+        self.order_items.prime(order.id for order in orders)
+        self.order_products.prime(order.id for order in orders)
+
+    def prime_nodes(self, nodes):
+        """Prime loaders for a page of model instances of any CRM type."""
+        nodes = list(nodes)
+        if not nodes:
+            return
+        if isinstance(nodes[0], Customer):
+            self.prime_customers(nodes)
+        elif isinstance(nodes[0], Order):
+            self.prime_orders(nodes)
+
+
+def get_loaders(info):
+    """Return the loaders attached to the request, creating them on first use."""
+    context = info.context
+    loaders = getattr(context, "crm_loaders", None)
+    if loaders is None:
+        loaders = Loaders()
+        try:
+            context.crm_loaders = loaders
+        except AttributeError:
+            # No context to hang them on (e.g. schema.execute without one):
+            # still correct, just not shared between resolvers.
+            pass
+    return loaders
+
+
+class BatchedFilterConnectionField(DjangoFilterConnectionField):
+    """Filter connection that primes the request loaders with each page.
+
+    Its queryset is narrowed to the selected fields by ``crm.optimizer``.
+    """
+
+    # Columns the connection reads itself, besides the selected fields
+    required_fields = ()
+
+    def wrap_resolve(self, parent_resolver):
+        return concurrent_when_async(super().wrap_resolve(parent_resolver))
+
+    def get_queryset_resolver(self):
+        return partial(
+            self.resolve_optimized_queryset,
+            super().get_queryset_resolver(),
+            self.required_fields,
+        )
+
+    @staticmethod
+    def resolve_optimized_queryset(resolve_queryset, required_fields,
+                                   connection, iterable, info, args):
+        queryset = resolve_queryset(connection, iterable, info, args)
+        return optimize_queryset(queryset, info, required_fields)
+
+    @classmethod
+    def connection_resolver(cls, resolver, connection, default_manager, queryset_resolver,
+                            max_limit, enforce_first_or_last, root, info, **args):
+        result = super().connection_resolver(
+            resolver, connection, default_manager, queryset_resolver,
+            max_limit, enforce_first_or_last, root, info, **args
+        )
+        edges = getattr(result, "edges", None)
+        if edges is not None:
+            get_loaders(info).prime_nodes(edge.node for edge in edges)
+        return result
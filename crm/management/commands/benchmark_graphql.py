@@ -0,0 +1,257 @@
+"""Benchmark a fixed set of GraphQL operations in-process and keep a baseline.
+
+Every scenario executes against ``alx_backend_graphql.schema.schema`` with a
+fresh context per run, as one HTTP request would get. Mutations run inside a
+transaction that is rolled back, so runs do not change the data and stay
+comparable. For each scenario the command records p50/p90/p99 latency, the
+number of SQL queries and the peak Python memory of one run::
+
+    python manage.py generate_crm_data --orders 1000000
+    python manage.py benchmark_graphql --output baseline.json
+    # ... change something ...
+    python manage.py benchmark_graphql --compare baseline.json --max-regression 20
+
+``--compare`` prints the change against a previous result file and, with
+``--max-regression``, fails when a p50 got slower by more than that
+percentage or a scenario issues more queries than before.
+"""
+import datetime
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from alx_backend_graphql.schema import schema
+from crm.benchmarking import percentile
+from crm.models import Customer, Order, OrderItem, Product
+
+FILTERED_ORDERS = """
+query FilteredOrders($minTotal: Decimal, $startDate: Date) {
+  allOrders(first: 50, minTotal: $minTotal, startDate: $startDate) {
+    totalCount
+    edges { node { id totalAmount customer { name } items { quantity product { name } } } }
+  }
+}
+"""
+
+ORDERS_PAGE = """
+query OrdersPage($after: String) {
+  allOrders(first: 100, after: $after) {
+    pageInfo { endCursor hasNextPage }
+    edges { node { id totalAmount customer { email } } }
+  }
+}
+"""
+
+BULK_CREATE_CUSTOMERS = """
+mutation BulkCreateCustomers($inputs: [CustomerInput]!) {
+  bulkCreateCustomers(inputs: $inputs) { customers { id } errors }
+}
+"""
+
+BULK_CREATE_ORDERS = """
+mutation BulkCreateOrders($inputs: [CreateOrderInput]!) {
+  bulkCreateOrders(inputs: $inputs) { orders { id totalAmount } errors }
+}
+"""
+
+RESTOCK = """
+mutation Restock {
+  updateLowStockProducts(threshold: 10, amount: 10) { message updatedProducts { id stock price } }
+}
+"""
+
+
+class Scenario:
+    def __init__(self, name, document, variables=None, mutation=False):
+        self.name = name
+        self.document = document
+        self.variables = variables or {}
+        self.mutation = mutation
+
+    def execute(self):
+        result = schema.execute(
+            self.document, variable_values=self.variables, context_value=SimpleNamespace()
+        )
+        if result.errors:
+            raise CommandError(f"{self.name}: {result.errors[0].message}")
+        return result
+
+    def run(self):
+        if not self.mutation:
+            return self.execute()
+        with transaction.atomic():
+            result = self.execute()
+            transaction.set_rollback(True)
+        return result
+
+
+def deep_cursor(pages):
+    """The cursor after walking ``pages`` pages of ``allOrders``."""
+    after = None
+    for _ in range(pages):
+        page = Scenario("deep cursor", ORDERS_PAGE, {"after": after}).execute().data["allOrders"]
+        if not page["pageInfo"]["hasNextPage"]:
+            break
+        after = page["pageInfo"]["endCursor"]
+    return after
+
+
+def scenarios(batch, depth):
+    """The benchmarked operations, with variables drawn from the current data."""
+    customers = Customer.objects.order_by("id").values_list("id", flat=True)
+    products = Product.objects.filter(stock__gte=50).order_by("id").values_list("id", flat=True)
+    customer_ids = [str(pk) for pk in customers[:batch]]
+    product_ids = [str(pk) for pk in products[:batch]]
+    if not customer_ids or not product_ids:
+        raise CommandError("Benchmarks need data; run generate_crm_data first.")
+
+    order_inputs = [
+        {
+            "customerId": customer_ids[i % len(customer_ids)],
+            "items": [
+                {"productId": product_ids[(i + j) % len(product_ids)], "quantity": 1}
+                for j in range(1 + i % 3)
+            ],
+        }
+        for i in range(batch)
+    ]
+    stamp = time.time_ns()
+    customer_inputs = [
+        {"name": f"Benchmark {i}", "email": f"benchmark-{stamp}-{i}@example.com"}
+        for i in range(batch)
+    ]
+    year_ago = (timezone.now() - datetime.timedelta(days=365)).date().isoformat()
+
+    return [
+        Scenario("allOrders filtered", FILTERED_ORDERS, {"minTotal": "100", "startDate": year_ago}),
+        Scenario(f"allOrders page {depth + 1}", ORDERS_PAGE, {"after": deep_cursor(depth)}),
+        Scenario(
+            f"bulkCreateCustomers x{batch}", BULK_CREATE_CUSTOMERS, {"inputs": customer_inputs}, True
+        ),
+        Scenario(f"bulkCreateOrders x{batch}", BULK_CREATE_ORDERS, {"inputs": order_inputs}, True),
+        Scenario("updateLowStockProducts", RESTOCK, mutation=True),
+    ]
+
+
+def measure(scenario, repeat, warmup):
+    for _ in range(warmup):
+        scenario.run()
+
+    latencies = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            scenario.run()
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(captured))
+
+    # Separately, since tracing allocations slows everything down
+    tracemalloc.start()
+    try:
+        scenario.run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "runs": repeat,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p90_ms": round(percentile(latencies, 0.90), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "queries": queries,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def change(old, new):
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+class Command(BaseCommand):
+    help = "Benchmark GraphQL operations in-process and write or compare a JSON baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--batch", type=int, default=100, help="Records per bulk mutation.")
+        parser.add_argument("--depth", type=int, default=50, help="Pages skipped for deep pagination.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--compare", help="Previous results file to compare against.")
+        parser.add_argument(
+            "--max-regression", type=float,
+            help="With --compare, fail if a p50 grew by more than this percentage.",
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1 or options["batch"] < 1:
+            raise CommandError("--repeat and --batch must be positive.")
+
+        results = {}
+        for scenario in scenarios(options["batch"], options["depth"]):
+            results[scenario.name] = measure(scenario, options["repeat"], options["warmup"])
+            row = results[scenario.name]
+            self.stdout.write(self.style.MIGRATE_HEADING(scenario.name))
+            self.stdout.write(
+                f"  p50 {row['p50_ms']:9.2f} ms  p90 {row['p90_ms']:9.2f} ms  p99 {row['p99_ms']:9.2f} ms"
+                f"  {row['queries']:4d} queries  {row['peak_memory_kb']:9.1f} KiB peak"
+            )
+
+        report = {"environment": self.environment(), "scenarios": results}
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+            self.compare(baseline["scenarios"], results, options["max_regression"])
+
+    def compare(self, baseline, results, max_regression):
+        regressions = []
+        self.stdout.write(self.style.MIGRATE_HEADING("Compared with baseline"))
+        for name, row in results.items():
+            old = baseline.get(name)
+            if old is None:
+                self.stdout.write(f"  {name}: not in baseline")
+                continue
+            self.stdout.write(
+                f"  {name}: p50 {change(old['p50_ms'], row['p50_ms'])}, "
+                f"p99 {change(old['p99_ms'], row['p99_ms'])}, "
+                f"queries {old['queries']} -> {row['queries']}, "
+                f"memory {change(old['peak_memory_kb'], row['peak_memory_kb'])}"
+            )
+            if max_regression is not None and (
+                row["p50_ms"] > old["p50_ms"] * (1 + max_regression / 100)
+                or row["queries"] > old["queries"]
+            ):
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f"Regressed: {', '.join(regressions)}")
+
+    @staticmethod
+    def environment():
+        return {
+            "recorded_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "rows": {
+                model._meta.label: model.objects.count()
+                for model in (Customer, Product, Order, OrderItem)
+            },
+        }
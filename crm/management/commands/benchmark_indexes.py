@@ -0,0 +1,112 @@
+"""Compare query plans and latency of the CRM access paths with and without
+the indexes from migration 0002.
+
+Run it against a scratch database; ``--seed`` fills it first::
+
+    python manage.py benchmark_indexes --seed --orders 3000000
+"""
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from crm.management.commands.generate_crm_data import seed
+from crm.models import Customer, Order, Product
+
+
+def access_paths():
+    """The queries the indexes were added for, as ``(name, queryset)``."""
+    now = timezone.now()
+    week_ago = now - datetime.timedelta(days=7)
+    year_ago = now - datetime.timedelta(days=365)
+    middle = now - datetime.timedelta(days=500)
+
+    return [
+        ("reminder scan (order_date >= now-7d)",
+         Order.objects.filter(order_date__gte=week_ago).order_by("order_date", "id")[:1000]),
+        ("allOrders keyset page",
+         Order.objects.filter(order_date__gt=middle).order_by("order_date", "id")[:50]),
+        ("OrderFilter minTotal",
+         Order.objects.filter(total_amount__gte=4990).order_by()[:50]),
+        ("customer orders (customer, order_date)",
+         Order.objects.filter(customer_id=1, order_date__gte=year_ago)),
+        ("inactive customer anti-join (NOT EXISTS)",
+         Customer.objects.filter(
+             ~Exists(Order.objects.filter(customer=OuterRef("pk"), order_date__gte=year_ago))
+         ).values("id")[:1000]),
+        ("allCustomers keyset page",
+         Customer.objects.filter(created_at__gt=middle).order_by("created_at", "id")[:50]),
+        ("low-stock scan (stock < 10)",
+         Product.objects.filter(stock__lt=10).values("id")),
+    ]
+
+
+def measure(queryset, repeat):
+    """Best wall time in milliseconds over ``repeat`` runs."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset._chain())
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = "Benchmark the CRM access paths with and without their indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", action="store_true", help="Insert a synthetic dataset first.")
+        parser.add_argument("--customers", type=int, default=200000)
+        parser.add_argument("--products", type=int, default=100000)
+        parser.add_argument("--orders", type=int, default=3000000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            self.stdout.write("Seeding...")
+            seed(self.stdout, options["customers"], options["products"], options["orders"])
+
+        self.stdout.write(
+            f"{Customer.objects.count()} customers, {Product.objects.count()} products, "
+            f"{Order.objects.count()} orders"
+        )
+
+        with_indexes = self.run_paths(options["repeat"])
+        self.drop_indexes()
+        try:
+            without_indexes = self.run_paths(options["repeat"])
+        finally:
+            self.stdout.write("Restoring indexes...")
+            self.add_indexes()
+
+        for name, (plan, ms) in with_indexes.items():
+            plan_without, ms_without = without_indexes[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f"  indexed:   {ms:10.2f} ms  {plan}")
+            self.stdout.write(f"  unindexed: {ms_without:10.2f} ms  {plan_without}")
+
+    def run_paths(self, repeat):
+        results = {}
+        for name, queryset in access_paths():
+            plan = " | ".join(line.strip() for line in queryset.explain().splitlines())
+            results[name] = (plan, measure(queryset, repeat))
+        return results
+
+    def indexed_models(self):
+        return [Customer, Product, Order]
+
+    def drop_indexes(self):
+        with connection.schema_editor() as editor:
+            for model in self.indexed_models():
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+
+    def add_indexes(self):
+        with connection.schema_editor() as editor:
+            for model in self.indexed_models():
+                for index in model._meta.indexes:
+                    editor.add_index(model, index)
@@ -0,0 +1,133 @@
+"""Delete customers without an order in the last ``--days`` days.
+
+Customers are visited in primary-key ranges of ``--batch-size``; each range
+is locked, deleted (line items, then orders, then customers) and committed
+in a transaction of its own, so writers such as ``createOrder`` only ever
+wait for one batch instead of the whole cleanup::
+
+    python manage.py clean_inactive_customers --dry-run
+    python manage.py clean_inactive_customers --batch-size 500 --pause 0.05
+
+When no ``pre_delete``/``post_delete`` receivers are connected for the
+models involved, batches are removed with plain ``DELETE ... WHERE id IN``
+statements instead of Django's collector, which would load every cascaded
+order into memory first.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Exists, Max, Min, OuterRef, signals
+from django.utils import timezone
+
+from crm.models import Customer, Order, OrderItem
+
+DELETE_ORDER = (OrderItem, Order, Customer)
+
+
+def inactive_customers(cutoff):
+    """Customers with no order placed at or after ``cutoff``."""
+    recent = Order.objects.filter(customer=OuterRef("pk"), order_date__gte=cutoff)
+    return Customer.objects.filter(~Exists(recent))
+
+
+def needs_collector():
+    """Whether deleting customers must go through Django's collector for signals."""
+    return any(
+        signals.pre_delete.has_listeners(model) or signals.post_delete.has_listeners(model)
+        for model in DELETE_ORDER
+    )
+
+
+def id_ranges(low, high, size):
+    for start in range(low, high + 1, size):
+        yield start, min(start + size, high + 1)
+
+
+def delete_batch(queryset, raw):
+    """Delete the customers in ``queryset`` and their orders; return counts per model."""
+    with transaction.atomic():
+        # Locking the rows makes concurrent order inserts for them wait
+        # (or fail), so nobody becomes active halfway through the batch
+        ids = list(queryset.select_for_update().values_list("pk", flat=True))
+        if not ids:
+            return {}
+        if not raw:
+            return Customer.objects.filter(pk__in=ids).delete()[1]
+
+        counts = {}
+        for model, lookup in (
+            (OrderItem, "order__customer_id__in"),
+            (Order, "customer_id__in"),
+            (Customer, "pk__in"),
+        ):
+            rows = model.objects.filter(**{lookup: ids})
+            counts[model._meta.label] = rows._raw_delete(rows.db)
+        return counts
+
+
+class Command(BaseCommand):
+    help = "Delete customers without recent orders, in short id-range batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=365, help="Inactivity period.")
+        parser.add_argument(
+            "--batch-size", type=int,
+            default=getattr(settings, "CRM_CLEANUP_BATCH_SIZE", 1000),
+            help="Customer ids per transaction.",
+        )
+        parser.add_argument(
+            "--pause", type=float, default=0.0,
+            help="Seconds to sleep between batches, letting queued writers in.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only count what would be deleted.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+        cutoff = timezone.now() - datetime.timedelta(days=options["days"])
+        inactive = inactive_customers(cutoff)
+
+        if options["dry_run"]:
+            orders = Order.objects.filter(customer__in=inactive.values("pk"))
+            self.stdout.write(
+                f"Would delete {inactive.count()} customers, {orders.count()} orders and "
+                f"{OrderItem.objects.filter(order__in=orders.values('pk')).count()} line items."
+            )
+            return
+
+        bounds = Customer.objects.aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["low"] is None:
+            self.stdout.write(self.log_line(0, 0, 0.0))
+            return
+
+        raw = not needs_collector()
+        totals = {model._meta.label: 0 for model in DELETE_ORDER}
+        started = time.perf_counter()
+        for low, high in id_ranges(bounds["low"], bounds["high"], options["batch_size"]):
+            counts = delete_batch(inactive.filter(pk__gte=low, pk__lt=high), raw)
+            for label, count in counts.items():
+                totals[label] = totals.get(label, 0) + count
+            if counts and options["verbosity"] >= 2:
+                self.stdout.write(f"  ids {low}-{high - 1}: {counts.get(Customer._meta.label, 0)} customers")
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        if options["verbosity"] >= 2:
+            for label, count in totals.items():
+                self.stdout.write(f"  {label}: {count}")
+        self.stdout.write(self.log_line(totals[Customer._meta.label], rows, elapsed))
+
+    @staticmethod
+    def log_line(customers, rows, elapsed):
+        rate = rows / elapsed if elapsed else 0.0
+        return (
+            f"{timezone.localtime():%Y-%m-%d %H:%M:%S} Deleted customers: {customers} "
+            f"({rows} rows in {elapsed:.2f}s, {rate:.0f} rows/s)"
+        )
@@ -0,0 +1,110 @@
+"""Compare latency and throughput of GraphQL endpoints under concurrent load.
+
+Start the project under a WSGI and an ASGI server, then point this at both::
+
+    gunicorn alx_backend_graphql.wsgi -w 4 --bind :8000
+    uvicorn alx_backend_graphql.asgi:application --workers 4 --port 8001
+
+    python manage.py graphql_loadtest \\
+        --url http://localhost:8000/graphql \\
+        --url http://localhost:8001/graphql/async \\
+        --concurrency 50 --requests 2000
+
+Each URL gets the same query, sent by ``--concurrency`` client threads until
+``--requests`` responses have come back; p50/p99 latency and requests per
+second are reported per URL. Neither server is a project requirement.
+"""
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.benchmarking import percentile
+
+DEFAULT_QUERY = """
+{
+  allCustomers(first: 20) { totalCount edges { node { name orders { id } } } }
+  allOrders(first: 20) {
+    totalCount
+    edges { node { totalAmount customer { name } items { quantity product { name } } } }
+  }
+  crmStats { customerCount orderCount revenue }
+}
+"""
+
+
+def run_load(url, body, concurrency, total, timeout):
+    """Send ``total`` POSTs from ``concurrency`` threads; return latencies, errors, seconds."""
+    remaining = iter(range(total))
+    lock = threading.Lock()
+    latencies = []
+    errors = []
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            request = urllib.request.Request(
+                url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    payload = json.loads(response.read())
+                error = payload.get("errors") and payload["errors"][0]["message"]
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                error = str(e)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if error:
+                    errors.append(error)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return latencies, errors, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = "Load-test GraphQL endpoints and report p50/p99 latency and throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", action="append", dest="urls",
+            help="Endpoint to test; repeat to compare several (e.g. WSGI and ASGI).",
+        )
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--query", default=DEFAULT_QUERY, help="GraphQL document to send.")
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        urls = options["urls"]
+        if not urls:
+            raise CommandError("Give at least one --url.")
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--concurrency and --requests must be positive.")
+
+        body = json.dumps({"query": options["query"]}).encode("utf-8")
+        for url in urls:
+            latencies, errors, seconds = run_load(
+                url, body, options["concurrency"], options["requests"], options["timeout"]
+            )
+            latencies.sort()
+            self.stdout.write(self.style.MIGRATE_HEADING(url))
+            self.stdout.write(f"  p50:        {percentile(latencies, 0.50) * 1000:10.2f} ms")
+            self.stdout.write(f"  p99:        {percentile(latencies, 0.99) * 1000:10.2f} ms")
+            self.stdout.write(f"  mean:       {statistics.fmean(latencies) * 1000:10.2f} ms")
+            self.stdout.write(f"  throughput: {len(latencies) / seconds:10.1f} req/s")
+            if errors:
+                self.stdout.write(self.style.WARNING(
+                    f"  {len(errors)} of {len(latencies)} requests failed, e.g. {errors[0]}"
+                ))
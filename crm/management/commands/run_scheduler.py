@@ -0,0 +1,69 @@
+"""Run the scheduled CRM jobs from this one process until stopped.
+
+    python manage.py run_scheduler            # until SIGINT/SIGTERM
+    python manage.py run_scheduler --list     # jobs and their next start
+    python manage.py run_scheduler --run crm-heartbeat
+
+On SIGINT or SIGTERM no new runs start; runs in progress are finished, and
+the runs, failures, skipped slots and durations of every job are printed.
+See ``crm.scheduler`` for the schedule format.
+"""
+import logging
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from crm.scheduler import Scheduler, configured_jobs, logger
+
+
+def seconds(value):
+    return "-" if value is None else f"{value:.3f}s"
+
+
+class Command(BaseCommand):
+    help = "Run the scheduled CRM jobs in one long-lived process."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--list", action="store_true", help="Print the jobs and exit.")
+        parser.add_argument("--run", metavar="JOB", help="Run one job now and exit.")
+
+    def handle(self, *args, **options):
+        if not logger.handlers:
+            handler = logging.StreamHandler(self.stdout)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+        jobs = configured_jobs()
+        if options["run"]:
+            by_name = {job.name: job for job in jobs}
+            if options["run"] not in by_name:
+                raise CommandError(f"Unknown job {options['run']!r}; known: {', '.join(by_name)}.")
+            job = by_name[options["run"]]
+            job.run()
+            if job.failures:
+                raise CommandError(f"{job.name} failed.")
+            return
+
+        scheduler = Scheduler(jobs)
+        self.stdout.write(f"{len(jobs)} jobs, times in {timezone.get_current_timezone_name()}:")
+        for job in jobs:
+            self.stdout.write(
+                f"  {job.name}: {job.task} at {job.schedule} (+{job.jitter}s jitter), "
+                f"next {timezone.localtime(job.next_run):%Y-%m-%d %H:%M:%S}"
+            )
+        if options["list"]:
+            scheduler.pool.shutdown()
+            return
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: scheduler.stop())
+        scheduler.run_forever()
+
+        for job in jobs:
+            longest = job.max_duration if job.runs else None
+            self.stdout.write(
+                f"  {job.name}: {job.runs} runs, {job.failures} failed, {job.skipped} skipped, "
+                f"mean {seconds(job.mean_duration)}, max {seconds(longest)}"
+            )
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:18
+
+import crm.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0005_jobcursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSearchRow',
+            fields=[
+                ('rank', models.FloatField()),
+                ('customer', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_row', serialize=False, to='crm.customer')),
+                ('text', crm.models.SearchMatchField(db_column='crm_customer_fts')),
+            ],
+            options={
+                'db_table': 'crm_customer_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSearchRow',
+            fields=[
+                ('rank', models.FloatField()),
+                ('product', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_row', serialize=False, to='crm.product')),
+                ('text', crm.models.SearchMatchField(db_column='crm_product_fts')),
+            ],
+            options={
+                'db_table': 'crm_product_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+    ]
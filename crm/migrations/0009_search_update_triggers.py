@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# Databases that ran 0003 before its update triggers were limited to the
+# indexed columns still reindex a row on every stock change: replace those
+# triggers. Later model changes must not alter this, so the SQL is literal.
+
+UPDATE_TRIGGERS = {
+    "crm_customer_fts": (
+        "CREATE TRIGGER crm_customer_fts_au AFTER UPDATE OF name, email, phone ON crm_customer BEGIN "
+        "INSERT INTO crm_customer_fts(crm_customer_fts, rowid, name, email, phone) "
+        "VALUES ('delete', old.id, old.name, old.email, old.phone); "
+        "INSERT INTO crm_customer_fts(rowid, name, email, phone) "
+        "VALUES (new.id, new.name, new.email, new.phone); END"
+    ),
+    "crm_product_fts": (
+        "CREATE TRIGGER crm_product_fts_au AFTER UPDATE OF name ON crm_product BEGIN "
+        "INSERT INTO crm_product_fts(crm_product_fts, rowid, name) "
+        "VALUES ('delete', old.id, old.name); "
+        "INSERT INTO crm_product_fts(rowid, name) VALUES (new.id, new.name); END"
+    ),
+}
+
+
+def replace_update_triggers(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor != "sqlite":
+        return
+    tables = conn.introspection.table_names()
+    with conn.cursor() as cursor:
+        for fts, trigger in UPDATE_TRIGGERS.items():
+            if fts in tables:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_au")
+                cursor.execute(trigger)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0008_order_customer_single_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(replace_update_triggers, migrations.RunPython.noop),
+    ]
@@ -6,6 +6,12 @@ class Customer(models.Model):
     phone = models.CharField(max_length=20, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # allCustomers keyset pagination
+            models.Index(fields=["created_at", "id"], name="crm_customer_created_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -15,15 +21,123 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            # Low-stock restock scan
+            models.Index(fields=["stock"], name="crm_product_stock_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
 
 class Order(models.Model):
-    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="orders")
-    products = models.ManyToManyField(Product, related_name="orders")
+    # crm_order_customer_date_idx leads with customer_id and serves FK lookups
+    customer = models.ForeignKey(
+        Customer, on_delete=models.CASCADE, related_name="orders", db_index=False
+    )
+    products = models.ManyToManyField(Product, related_name="orders", through="OrderItem")
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     order_date = models.DateTimeField(auto_now_add=True)
+    # Maintained when the items are written: number of lines and of units
+    item_count = models.PositiveIntegerField(default=0)
+    unit_count = models.PositiveIntegerField(default=0)
+    # When the order was included in a reminder email (crm.reminders)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # allOrders keyset pagination, date filters and the reminder scan
+            models.Index(fields=["order_date", "id"], name="crm_order_date_idx"),
+            # Inactive-customer cleanup anti-join and Customer.orders
+            models.Index(fields=["customer", "order_date"], name="crm_order_customer_date_idx"),
+            # OrderFilter minTotal/maxTotal
+            models.Index(fields=["total_amount"], name="crm_order_total_idx"),
+        ]
 
     def __str__(self):
         return f"Order {self.id} - {self.customer.name}"
+
+
+class OrderItem(models.Model):
+    """One product line of an order, priced when the order was placed."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="order_items")
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Copy of order.order_date so sales reports never join orders
+    order_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = [("order", "product")]
+        indexes = [
+            # Revenue-by-product and best sellers over a date window
+            models.Index(fields=["order_date", "product"], name="crm_orderitem_date_idx"),
+        ]
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} (order {self.order_id})"
+
+
+class JobCursor(models.Model):
+    """How far a recurring job has got, e.g. the last order it reminded about."""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class SearchMatch(models.Lookup):
+    """``<fts table> MATCH <query>``, filtering an FTS5 table by a full-text query."""
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class SearchMatchField(models.TextField):
+    """The hidden column an FTS5 table has under its own name."""
+
+
+SearchMatchField.register_lookup(SearchMatch)
+
+
+class SearchRow(models.Model):
+    """A row of an SQLite FTS5 search table, maintained by ``crm.search``.
+
+    Joined to its model on rowid so a search is one query driven by the FTS
+    index; ``rank`` is the bm25 score for the ``text__match`` of that same query.
+    """
+    rank = models.FloatField()
+
+    class Meta:
+        abstract = True
+        managed = False
+
+
+class CustomerSearchRow(SearchRow):
+    customer = models.OneToOneField(
+        Customer, models.DO_NOTHING, primary_key=True, db_column="rowid", related_name="search_row"
+    )
+    text = SearchMatchField(db_column="crm_customer_fts")
+
+    class Meta(SearchRow.Meta):
+        db_table = "crm_customer_fts"
+
+
+class ProductSearchRow(SearchRow):
+    product = models.OneToOneField(
+        Product, models.DO_NOTHING, primary_key=True, db_column="rowid", related_name="search_row"
+    )
+    text = SearchMatchField(db_column="crm_product_fts")
+
+    class Meta(SearchRow.Meta):
+        db_table = "crm_product_fts"
@@ -0,0 +1,183 @@
+"""Build querysets from the fields a GraphQL query actually selects.
+
+``optimize_queryset(queryset, info)`` walks the selection set of the field
+being resolved (through fragments and connection ``edges { node }``
+wrappers) and maps it onto the model of the ``DjangoObjectType``:
+
+* selected columns become ``.only(...)``; the primary key and foreign key
+  columns are always kept, since the request loaders key on them;
+* selected forward relations become ``select_related`` with their own
+  columns pruned the same way;
+* selected reverse and many-to-many relations become ``Prefetch`` objects
+  whose querysets are optimized recursively. They are stored as plain lists
+  (``prefetched(obj, name)``), which is cheaper than a queryset per row;
+  resolvers fall back to the request loaders when nothing was prefetched.
+
+Fields that are not model fields may name the columns they read in a
+``column_hints`` dict on their type; a field without a hint keeps every
+column of its model, so a resolver never trips over a deferred field.
+Connection fields in ``crm.loaders`` apply this automatically; any other
+field can call it from its resolver.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene import Dynamic, List, NonNull
+from graphene.relay import Connection
+from graphene.utils.str_converters import to_camel_case
+from graphene_django import DjangoObjectType
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def prefetched(obj, name):
+    """Rows of relation ``name`` prefetched onto ``obj`` here, else ``None``."""
+    return getattr(obj, f"prefetched_{name}", None)
+
+
+def _unwrap(type_):
+    while isinstance(type_, (List, NonNull)):
+        type_ = type_.of_type
+    return type_
+
+
+def _field_type(field):
+    if isinstance(field, Dynamic):
+        # graphene-django mounts model relations as Dynamic fields
+        field = field.get_type()
+    return field.type if field is not None else None
+
+
+def _is_subclass(type_, base):
+    return isinstance(type_, type) and issubclass(type_, base)
+
+
+def collect_fields(selection_nodes, info):
+    """Sub-selections by field name, merged over aliases and fragments."""
+    fields = {}
+    pending = list(selection_nodes)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, FieldNode):
+            fields.setdefault(node.name.value, []).extend(
+                node.selection_set.selections if node.selection_set else ()
+            )
+        elif isinstance(node, InlineFragmentNode):
+            pending.extend(node.selection_set.selections)
+        elif isinstance(node, FragmentSpreadNode):
+            pending.extend(info.fragments[node.name.value].selection_set.selections)
+    return fields
+
+
+def node_selections(type_, selections, info):
+    """``(object type, selections)`` under a connection's ``edges { node }``, if any."""
+    type_ = _unwrap(type_)
+    if _is_subclass(type_, Connection):
+        edges = collect_fields(selections, info).get("edges", [])
+        return type_._meta.node, collect_fields(edges, info).get("node", [])
+    return type_, selections
+
+
+class QueryPlan:
+    """Columns, joins and prefetches for one model in a selection."""
+
+    def __init__(self, model):
+        self.model = model
+        self.only = set()
+        self.select_related = set()
+        self.prefetches = []
+        # Cleared when a selected field may read columns we cannot name
+        self.prunable = True
+
+    def add_required(self, model, prefix):
+        """Keys the request loaders and the ORM read on every row."""
+        for field in model._meta.concrete_fields:
+            if field.primary_key or field.is_relation:
+                self.only.add(f"{prefix}{field.name}")
+
+    def plan(self, graphene_type, model, selections, info, prefix=""):
+        self.add_required(model, prefix)
+        graphene_fields = graphene_type._meta.fields
+        names = {to_camel_case(name): name for name in graphene_fields}
+        hints = getattr(graphene_type, "column_hints", {})
+
+        for graphql_name, sub_selections in collect_fields(selections, info).items():
+            name = names.get(graphql_name)
+            if name is None:
+                continue  # __typename
+            if name in hints:
+                self.only.update(f"{prefix}{column}" for column in hints[name])
+                continue
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                self.prunable = False
+                continue
+
+            if not field.is_relation:
+                self.only.add(f"{prefix}{field.name}")
+                continue
+
+            related_type, related_selections = node_selections(
+                _field_type(graphene_fields[name]), sub_selections, info
+            )
+            if not _is_subclass(related_type, DjangoObjectType):
+                self.prunable = False
+                continue
+            if field.many_to_one or (field.one_to_one and field.concrete):
+                self.select_related.add(f"{prefix}{name}")
+                self.plan(related_type, field.related_model, related_selections, info,
+                          f"{prefix}{name}__")
+            else:
+                queryset = optimize_selection(
+                    field.related_model._default_manager.order_by("pk"),
+                    related_type, related_selections, info,
+                )
+                self.prefetches.append(
+                    Prefetch(f"{prefix}{name}", queryset=queryset, to_attr=f"prefetched_{name}")
+                )
+        return self
+
+    def apply(self, queryset, required_fields=()):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetches:
+            queryset = queryset.prefetch_related(*self.prefetches)
+        if self.prunable:
+            required = []
+            for name in required_fields:
+                try:
+                    required.append(self.model._meta.get_field(name).name)
+                except FieldDoesNotExist:
+                    pass  # annotations such as search_rank
+            queryset = queryset.only(*self.only, *required)
+        return queryset
+
+
+def optimize_selection(queryset, graphene_type, selections, info, required_fields=()):
+    """Optimize ``queryset`` for ``selections`` of objects of ``graphene_type``."""
+    plan = QueryPlan(queryset.model).plan(graphene_type, queryset.model, selections, info)
+    return plan.apply(queryset, required_fields)
+
+
+def optimize_queryset(queryset, info, required_fields=()):
+    """Optimize ``queryset`` for the field ``info`` resolves.
+
+    ``required_fields`` are columns the caller reads itself, e.g. the sort
+    key of a keyset connection.
+    """
+    graphene_type = getattr(info.return_type, "graphene_type", None)
+    if graphene_type is None:
+        # Wrapped in NonNull/List
+        of_type = info.return_type
+        while hasattr(of_type, "of_type"):
+            of_type = of_type.of_type
+        graphene_type = getattr(of_type, "graphene_type", None)
+    selections = [
+        selection
+        for node in info.field_nodes
+        if node.selection_set
+        for selection in node.selection_set.selections
+    ]
+    node_type, selections = node_selections(graphene_type, selections, info)
+    if not _is_subclass(node_type, DjangoObjectType) or node_type._meta.model is not queryset.model:
+        return queryset
+    return optimize_selection(queryset, node_type, selections, info, required_fields)
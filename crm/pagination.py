@@ -0,0 +1,183 @@
+"""Keyset (seek) pagination for the CRM connections.
+
+Instead of ``OFFSET n`` the page is selected with a ``WHERE`` on the sort
+key of the last row seen, so page 10,000 costs the same as page 1 given an
+index on the ordering columns. Cursors are opaque base64 JSON of that sort
+key. ``totalCount`` is only computed when a client selects it. Querysets
+annotated with a ``search_rank`` are paged by ``(search_rank, id)`` instead.
+"""
+import base64
+import datetime
+import json
+from decimal import Decimal
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from graphene.relay import PageInfo
+
+from .loaders import BatchedFilterConnectionField, concurrent_when_async, get_loaders
+
+
+def _encode_value(value):
+    # Full precision: DjangoJSONEncoder would cut microseconds off datetimes
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(values):
+    payload = json.dumps(values, default=_encode_value, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, fields):
+    """Return the sort key stored in ``cursor`` as Python values."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, UnicodeError, ValidationError):
+        raise Exception(f"Invalid cursor: {cursor}")
+
+
+def seek(ordering, values, forward=True):
+    """``Q`` for rows strictly after (or before) ``values`` in ``ordering``.
+
+    Expands the row comparison ``(a, b) > (x, y)`` into
+    ``a > x OR (a = x AND b > y)``, which every backend can answer from a
+    composite index on ``(a, b)``.
+    """
+    lookup = "gt" if forward else "lt"
+    condition = Q()
+    for i, name in enumerate(ordering):
+        term = Q(**{f"{name}__{lookup}": values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            term &= Q(**{previous: value})
+        condition |= term
+    return condition
+
+
+class KeysetConnectionField(BatchedFilterConnectionField):
+    """Filter connection paginated by a unique ascending ``ordering``."""
+
+    def __init__(self, type_, *args, ordering=("id",), **kwargs):
+        self.ordering = tuple(ordering)
+        super().__init__(type_, *args, **kwargs)
+
+    @property
+    def required_fields(self):
+        # Cursors are built from the sort key of each row
+        return self.ordering
+
+    @property
+    def args(self):
+        args = super().args
+        # Offsets are exactly what keyset pagination avoids
+        args.pop("offset", None)
+        return args
+
+    @args.setter
+    def args(self, args):
+        self._base_args = args
+
+    def wrap_resolve(self, parent_resolver):
+        return concurrent_when_async(partial(
+            self.keyset_connection_resolver,
+            self.ordering,
+            self.resolver or parent_resolver,
+            self.connection_type,
+            self.get_manager(),
+            self.get_queryset_resolver(),
+            self.max_limit,
+            self.enforce_first_or_last,
+        ))
+
+    @classmethod
+    def keyset_connection_resolver(cls, ordering, resolver, connection, default_manager,
+                                   queryset_resolver, max_limit, enforce_first_or_last,
+                                   root, info, **args):
+        first = args.get("first")
+        last = args.get("last")
+
+        if enforce_first_or_last and not (first or last):
+            raise Exception(
+                f"You must provide a `first` or `last` value to properly paginate "
+                f"the `{info.field_name}` connection."
+            )
+        if first is not None and last is not None:
+            raise Exception("Pass either `first` or `last`, not both.")
+        for name, value in (("first", first), ("last", last)):
+            if value is not None and value < 0:
+                raise Exception(f"`{name}` must be a non-negative integer.")
+            if value is not None and max_limit and value > max_limit:
+                raise Exception(
+                    f"Requesting {value} records on the `{info.field_name}` connection "
+                    f"exceeds the `{name}` limit of {max_limit} records."
+                )
+        if first is None and last is None:
+            first = max_limit
+
+        iterable = resolver(root, info, **args)
+        if iterable is None:
+            iterable = default_manager
+        queryset = queryset_resolver(connection, iterable, info, args)
+
+        annotations = queryset.query.annotations
+        if "search_rank" in annotations:
+            # Ranked search results page in rank order
+            ordering = ("search_rank", "id")
+        fields, attnames = [], []
+        for name in ordering:
+            if name in annotations:
+                fields.append(annotations[name].output_field)
+                attnames.append(name)
+            else:
+                field = queryset.model._meta.get_field(name)
+                fields.append(field)
+                attnames.append(field.attname)
+
+        page = queryset
+        if args.get("after"):
+            page = page.filter(seek(ordering, decode_cursor(args["after"], fields), True))
+        if args.get("before"):
+            page = page.filter(seek(ordering, decode_cursor(args["before"], fields), False))
+
+        if last is not None:
+            page = page.order_by(*(f"-{name}" for name in ordering))
+            size = last
+        else:
+            page = page.order_by(*ordering)
+            size = first
+
+        # One extra row tells whether there is another page
+        nodes = list(page[:size + 1]) if size is not None else list(page)
+        has_more = size is not None and len(nodes) > size
+        nodes = nodes[:size] if size is not None else nodes
+        if last is not None:
+            nodes.reverse()
+
+        edges = [
+            connection.Edge(
+                node=node,
+                cursor=encode_cursor([getattr(node, attname) for attname in attnames]),
+            )
+            for node in nodes
+        ]
+        page_info = PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_more if last is not None else bool(args.get("after")),
+            has_next_page=has_more if last is None else bool(args.get("before")),
+        )
+
+        result = connection(edges=edges, page_info=page_info)
+        # Counted lazily by CountableConnection.resolve_total_count
+        result.iterable = queryset
+        result.length = None
+
+        get_loaders(info).prime_nodes(nodes)
+        return result
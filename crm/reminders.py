@@ -0,0 +1,132 @@
+"""Reminder emails about recent orders.
+
+Orders placed in the last ``CRM_REMINDER_WINDOW_DAYS`` days are read in
+keyset pages (``id > last seen``), grouped so every customer gets a single
+email listing all of their new orders, and sent in batches, each over its
+own mail connection, from a thread pool.
+
+The id of the last order handled is kept in the ``order_reminders``
+``JobCursor``, so a rerun only picks up orders placed since. When a batch
+fails to send, the cursor stops short of its orders and the next run retries
+those customers; every order that was sent gets ``reminder_sent_at``, so the
+orders between a failed one and the end of the run are not sent twice.
+
+Mail goes through ``CRM_REMINDER_EMAIL_BACKEND`` (``EMAIL_BACKEND`` when
+unset); ``django.core.mail.backends.locmem.EmailBackend`` or ``console``
+stub it out locally.
+"""
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import JobCursor, Order
+
+logger = logging.getLogger(__name__)
+
+REMINDER_CURSOR = "order_reminders"
+
+REMINDER_SUBJECT = "Reminder: your recent orders"
+
+
+def iter_recent_orders(since, after_id, page_size):
+    """Yield unreminded order rows placed at or after ``since`` with an id above ``after_id``, by id."""
+    last = after_id
+    while True:
+        page = list(
+            Order.objects.filter(order_date__gte=since, id__gt=last, reminder_sent_at__isnull=True)
+            .order_by("id")
+            .values_list("id", "customer_id", "customer__name", "customer__email",
+                         "total_amount", "order_date")[:page_size]
+        )
+        yield from page
+        if len(page) < page_size:
+            return
+        last = page[-1][0]
+
+
+def group_by_customer(rows):
+    """One reminder dict per customer, with their orders in id order."""
+    reminders = {}
+    for order_id, customer_id, name, email, total_amount, order_date in rows:
+        reminder = reminders.setdefault(
+            customer_id, {"name": name, "email": email, "orders": []}
+        )
+        reminder["orders"].append((order_id, total_amount, order_date))
+    return list(reminders.values())
+
+
+def build_message(reminder):
+    lines = [f"Hi {reminder['name']},", "", "Thanks for your recent orders:"]
+    lines.extend(
+        f"  Order #{order_id} placed {order_date:%Y-%m-%d}, total {total_amount}"
+        for order_id, total_amount, order_date in reminder["orders"]
+    )
+    return EmailMessage(REMINDER_SUBJECT, "\n".join(lines), to=[reminder["email"]])
+
+
+def send_batch(reminders, backend=None):
+    """Send one email per reminder over a single connection."""
+    with get_connection(backend) as connection:
+        return connection.send_messages([build_message(reminder) for reminder in reminders]) or 0
+
+
+def send_reminders(reminders, batch_size, workers, backend=None):
+    """Send the reminders in parallel batches; return ``(sent, failed reminders)``."""
+    batches = [reminders[i:i + batch_size] for i in range(0, len(reminders), batch_size)]
+    sent = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(batch, pool.submit(send_batch, batch, backend)) for batch in batches]
+        for batch, future in futures:
+            try:
+                sent += future.result()
+            except Exception:
+                logger.exception("Sending %d order reminders failed", len(batch))
+                failed.extend(batch)
+    return sent, failed
+
+
+def send_order_reminders(now=None):
+    """Remind every customer with orders since the last run; return a summary dict."""
+    now = now or timezone.now()
+    since = now - datetime.timedelta(days=getattr(settings, "CRM_REMINDER_WINDOW_DAYS", 7))
+    cursor, _ = JobCursor.objects.get_or_create(name=REMINDER_CURSOR)
+
+    page_size = getattr(settings, "CRM_REMINDER_PAGE_SIZE", 1000)
+    reminders = group_by_customer(iter_recent_orders(since, cursor.position, page_size))
+    order_ids = [order[0] for reminder in reminders for order in reminder["orders"]]
+    sent, failed = send_reminders(
+        reminders,
+        getattr(settings, "CRM_REMINDER_BATCH_SIZE", 100),
+        getattr(settings, "CRM_REMINDER_WORKERS", 4),
+        getattr(settings, "CRM_REMINDER_EMAIL_BACKEND", None),
+    )
+
+    failed_ids = {order[0] for reminder in failed for order in reminder["orders"]}
+    sent_ids = [order_id for order_id in order_ids if order_id not in failed_ids]
+    for start in range(0, len(sent_ids), page_size):
+        Order.objects.filter(id__in=sent_ids[start:start + page_size]).update(reminder_sent_at=now)
+
+    if failed_ids:
+        # Everything before the first unsent order is done; sent orders
+        # after it are skipped by their reminder_sent_at on the retry
+        position = min(failed_ids) - 1
+    elif order_ids:
+        position = max(order_ids)
+    else:
+        position = cursor.position
+    if position != cursor.position:
+        cursor.position = position
+        cursor.save(update_fields=["position", "updated_at"])
+
+    return {
+        "orders": len(order_ids),
+        "customers": len(reminders),
+        "sent": sent,
+        "failed": len(failed),
+        "position": position,
+    }
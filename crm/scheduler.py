@@ -0,0 +1,222 @@
+"""Run the periodic CRM jobs from one long-lived process.
+
+``python manage.py run_scheduler`` replaces a ``manage.py`` spawn per cron
+tick (django-crontab) and a separate Celery beat: Django, the schema and the
+job documents are loaded once, and each job then costs only its own work.
+The jobs are ``DEFAULT_JOBS`` unless ``CRM_SCHEDULER_JOBS`` replaces them::
+
+    CRM_SCHEDULER_JOBS = {
+        "crm-heartbeat": {"task": "crm.cron.log_crm_heartbeat", "schedule": "*/5 * * * *"},
+        "generate-crm-report": {"task": "crm.tasks.generate_crm_report",
+                                "schedule": "0 6 * * mon", "jitter": 300},
+    }
+
+``schedule`` is a five-field cron line in ``TIME_ZONE``, a dict of
+``celery.schedules.crontab`` arguments, or an interval in seconds.
+
+* Every run starts a random 0..``jitter`` seconds (``CRM_SCHEDULER_JITTER``)
+  after its slot, so jobs sharing a slot do not all hit the database at once.
+* A job never overlaps itself: a slot that comes up while the previous run
+  is still going is skipped and counted.
+* Each run is logged to ``crm.scheduler`` with its duration, and the totals
+  per job are kept on the ``ScheduledJob``.
+
+Jobs run on worker threads, so a slow restock does not delay the heartbeat.
+Run one scheduler per deployment; two would each run every job.
+"""
+import datetime
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from celery.schedules import crontab
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS = {
+    "crm-heartbeat": {"task": "crm.cron.log_crm_heartbeat", "schedule": "*/5 * * * *"},
+    "update-low-stock": {"task": "crm.cron.update_low_stock", "schedule": "0 */12 * * *"},
+    "generate-crm-report": {"task": "crm.tasks.generate_crm_report", "schedule": "0 6 * * mon"},
+}
+
+# Seconds between checks when no job is configured
+IDLE_WAIT = 60
+
+# Farthest a cron schedule is searched for its next slot
+MAX_SEARCH_DAYS = 4 * 366
+
+
+class CronSchedule:
+    """Slots of a cron line, parsed by ``celery.schedules.crontab``."""
+
+    def __init__(self, minute="*", hour="*", day_of_month="*", month_of_year="*", day_of_week="*"):
+        self.crontab = crontab(
+            minute=minute, hour=hour, day_of_week=day_of_week,
+            day_of_month=day_of_month, month_of_year=month_of_year,
+        )
+        self.line = f"{minute} {hour} {day_of_month} {month_of_year} {day_of_week}"
+        self.minutes = sorted(self.crontab.minute)
+        self.hours = sorted(self.crontab.hour)
+
+    @classmethod
+    def from_line(cls, line):
+        fields = line.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expected five cron fields, got {line!r}.")
+        return cls(*fields)
+
+    def matches_day(self, moment):
+        # crontab counts weekdays from Sunday = 0
+        return (
+            moment.month in self.crontab.month_of_year
+            and moment.day in self.crontab.day_of_month
+            and (moment.weekday() + 1) % 7 in self.crontab.day_of_week
+        )
+
+    def next_after(self, moment):
+        """The first slot strictly after ``moment`` (local time)."""
+        moment = timezone.localtime(moment)
+        start = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(MAX_SEARCH_DAYS):
+            if self.matches_day(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        slot = day.replace(hour=hour, minute=minute)
+                        if slot >= start:
+                            return slot
+            day += datetime.timedelta(days=1)
+        raise ValueError(f"{self.line!r} has no slot in the next {MAX_SEARCH_DAYS} days.")
+
+    def __str__(self):
+        return self.line
+
+
+class IntervalSchedule:
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError("Intervals must be positive.")
+        self.interval = datetime.timedelta(seconds=seconds)
+
+    def next_after(self, moment):
+        return moment + self.interval
+
+    def __str__(self):
+        return f"every {self.interval.total_seconds():g}s"
+
+
+def parse_schedule(schedule):
+    if isinstance(schedule, str):
+        return CronSchedule.from_line(schedule)
+    if isinstance(schedule, dict):
+        return CronSchedule(**schedule)
+    if isinstance(schedule, datetime.timedelta):
+        return IntervalSchedule(schedule.total_seconds())
+    return IntervalSchedule(schedule)
+
+
+class ScheduledJob:
+    """One job, its next start and what its runs cost so far."""
+
+    def __init__(self, name, task, schedule, jitter=None):
+        self.name = name
+        self.task = task
+        self.schedule = parse_schedule(schedule)
+        self.jitter = getattr(settings, "CRM_SCHEDULER_JITTER", 30) if jitter is None else jitter
+        self.slot = None
+        self.next_run = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+
+    def plan(self, slot):
+        self.slot = slot
+        self.next_run = slot + datetime.timedelta(seconds=random.uniform(0, self.jitter))
+
+    def plan_next(self, now):
+        """Plan the slot after the current one, or after ``now`` if that passed too."""
+        slot = self.schedule.next_after(self.slot if self.slot is not None else now)
+        if slot <= now:
+            # Slots missed while the process was stopped or busy are not caught up
+            slot = self.schedule.next_after(now)
+        self.plan(slot)
+
+    def run(self):
+        """Run the task in this thread and record how long it took."""
+        close_old_connections()
+        started = time.perf_counter()
+        try:
+            import_string(self.task)()
+        except Exception:
+            self.failures += 1
+            logger.exception("%s failed after %.3fs", self.name, time.perf_counter() - started)
+        else:
+            logger.info("%s finished in %.3fs", self.name, time.perf_counter() - started)
+        finally:
+            duration = time.perf_counter() - started
+            self.runs += 1
+            self.last_duration = duration
+            self.max_duration = max(self.max_duration, duration)
+            self.total_duration += duration
+            self.running = False
+            close_old_connections()
+
+    @property
+    def mean_duration(self):
+        return self.total_duration / self.runs if self.runs else None
+
+
+def configured_jobs():
+    jobs = getattr(settings, "CRM_SCHEDULER_JOBS", DEFAULT_JOBS)
+    return [ScheduledJob(name, **options) for name, options in jobs.items()]
+
+
+class Scheduler:
+    """Starts due jobs on a thread pool until ``stop()`` is called."""
+
+    def __init__(self, jobs, now=timezone.now):
+        self.jobs = list(jobs)
+        self.now = now
+        self.stopped = threading.Event()
+        self.pool = ThreadPoolExecutor(
+            max_workers=max(len(self.jobs), 1), thread_name_prefix="crm-scheduler"
+        )
+        started = self.now()
+        for job in self.jobs:
+            job.plan_next(started)
+
+    def tick(self):
+        """Start every job that is due; the seconds until the next one is."""
+        now = self.now()
+        for job in self.jobs:
+            if job.next_run > now:
+                continue
+            if job.running:
+                job.skipped += 1
+                logger.warning("%s skipped: the previous run is still going", job.name)
+            else:
+                job.running = True
+                self.pool.submit(job.run)
+            job.plan_next(now)
+        if not self.jobs:
+            return IDLE_WAIT
+        return max((min(job.next_run for job in self.jobs) - now).total_seconds(), 0)
+
+    def run_forever(self):
+        while not self.stopped.is_set():
+            self.stopped.wait(self.tick())
+        # Let running jobs finish rather than cutting them off mid-write
+        self.pool.shutdown(wait=True)
+
+    def stop(self):
+        self.stopped.set()
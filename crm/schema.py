@@ -1,98 +1,158 @@
 import graphene
 from graphene_django import DjangoObjectType
-from .models import Customer, Product, Order
+from .models import Customer, Product, Order, OrderItem
 import re
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 import django_filters
-from graphene_django.filter import DjangoFilterConnectionField
 from crm.models import Product 
+from .loaders import BatchedFilterConnectionField, OrderProductsLoader, get_loaders, in_event_loop
+from .optimizer import prefetched
+from .pagination import KeysetConnectionField
+from .search import get_search_backend
+from .services import (
+    acrm_stats,
+    aorder_breakdown,
+    aproduct_sales,
+    build_order_items,
+    crm_stats,
+    order_breakdown,
+    order_totals,
+    product_sales,
+    reserve_stock,
+    restock_low_stock,
+)
 
-# Define ProductType for GraphQL
-class ProductType(DjangoObjectType):
+# === GraphQL Types ===
+class CountableConnection(graphene.relay.Connection):
     class Meta:
-        model = Product
-        fields = ("id", "name", "stock")
-
-
-# Mutation class
-class UpdateLowStockProducts(graphene.Mutation):
-    class Arguments:
-        pass  # no arguments, just updates all low stock
-
-    updated_products = graphene.List(ProductType)
-    message = graphene.String()
-
-    def mutate(self, info):
-        low_stock_products = Product.objects.filter(stock__lt=10)
-        updated = []
-
-        for product in low_stock_products:
-            product.stock += 10
-            product.save()
-            updated.append(product)
-
-        return UpdateLowStockProducts(
-            updated_products=updated,
-            message=f"{len(updated)} products updated successfully!",
-        )
+        abstract = True
 
+    total_count = graphene.Int()
 
-# Root mutation
-class Mutation(graphene.ObjectType):
-    update_low_stock_products = UpdateLowStockProducts.Field()
+    def resolve_total_count(root, info):
+        # Keyset connections leave the COUNT(*) until it is actually selected
+        if root.length is None:
+            if in_event_loop():
+                return _acount(root)
+            root.length = root.iterable.count()
+        return root.length
 
 
-# Schema entry point
-class Query(graphene.ObjectType):
-    hello = graphene.String(default_value="Hello World!")  # useful for Task 2
-    # add your other queries here...
+async def _acount(connection):
+    connection.length = await connection.iterable.acount()
+    return connection.length
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
 
-
-
-# === GraphQL Types ===
+# Relations resolve through the request-scoped loaders in crm.loaders so
+# nested selections cost one batched query per level, not one per row.
+# Connection querysets prefetch what the query selects (crm.optimizer);
+# resolvers use those rows when they are there.
 class CustomerType(DjangoObjectType):
+    orders = graphene.List(lambda: OrderType)
+
     class Meta:
         model = Customer
-        fields = ("id", "name", "email", "phone", "created_at")
+        fields = ("id", "name", "email", "phone", "created_at", "orders")
+        use_connection = True
+        connection_class = CountableConnection
+
+    def resolve_orders(root, info):
+        orders = prefetched(root, "orders")
+        if orders is not None:
+            return orders
+        return get_loaders(info).customer_orders.load(root.id)
 
 
 class ProductType(DjangoObjectType):
     class Meta:
         model = Product
         fields = ("id", "name", "price", "stock")
+        use_connection = True
+        connection_class = CountableConnection
+
+
+class OrderItemType(DjangoObjectType):
+    line_total = graphene.Decimal()
+
+    # Columns read by fields that are not model fields (see crm.optimizer)
+    column_hints = {"line_total": ("unit_price", "quantity")}
+
+    class Meta:
+        model = OrderItem
+        fields = ("id", "product", "quantity", "unit_price", "line_total")
 
 
 class OrderType(DjangoObjectType):
+    customer = graphene.Field(lambda: CustomerType)
+    products = graphene.List(lambda: ProductType)
+    items = graphene.List(OrderItemType)
+
     class Meta:
         model = Order
-        fields = ("id", "customer", "products", "total_amount", "order_date")
+        fields = (
+            "id", "customer", "products", "items", "total_amount", "order_date",
+            "item_count", "unit_count",
+        )
+        use_connection = True
+        connection_class = CountableConnection
+
+    def resolve_customer(root, info):
+        if Order.customer.is_cached(root):
+            return root.customer
+        return get_loaders(info).customer.load(root.customer_id)
+
+    def resolve_products(root, info):
+        products = prefetched(root, "products")
+        if products is not None:
+            return products
+        return get_loaders(info).order_products.load(root.id)
+
+    def resolve_items(root, info):
+        items = prefetched(root, "items")
+        if items is not None:
+            return items
+        return get_loaders(info).order_items.load(root.id)
+
+
+class ContainsFilterSet(django_filters.FilterSet):
+    """Substring filters answered by the configured ``crm.search`` backend."""
+
+    def filter_contains(self, queryset, name, value):
+        return get_search_backend().filter_contains(queryset, name, value)
 
 
-class CustomerFilter(django_filters.FilterSet):
-    name = django_filters.CharFilter(lookup_expr='icontains')
-    email = django_filters.CharFilter(lookup_expr='icontains')
-    phone = django_filters.CharFilter(lookup_expr='icontains')
+class SearchFilterSet(ContainsFilterSet):
+    search = django_filters.CharFilter(method='filter_search')
+
+    def filter_search(self, queryset, name, value):
+        # Best match first; keyset connections page by search_rank
+        return get_search_backend().search(queryset, value).order_by('search_rank', 'pk')
+
+
+class CustomerFilter(SearchFilterSet):
+    name = django_filters.CharFilter(method='filter_contains')
+    email = django_filters.CharFilter(method='filter_contains')
+    phone = django_filters.CharFilter(method='filter_contains')
 
     class Meta:
         model = Customer
-        fields = ['name', 'email', 'phone']
+        fields = ['name', 'email', 'phone', 'search']
 
 
-class ProductFilter(django_filters.FilterSet):
-    name = django_filters.CharFilter(lookup_expr='icontains')
+class ProductFilter(SearchFilterSet):
+    name = django_filters.CharFilter(method='filter_contains')
     price_min = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
     price_max = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
 
     class Meta:
         model = Product
-        fields = ['name', 'price']
+        fields = ['name', 'price', 'search']
 
 
-class OrderFilter(django_filters.FilterSet):
-    customer_name = django_filters.CharFilter(field_name='customer__name', lookup_expr='icontains')
+class OrderFilter(ContainsFilterSet):
+    customer_name = django_filters.CharFilter(field_name='customer__name', method='filter_contains')
     min_total = django_filters.NumberFilter(field_name='total_amount', lookup_expr='gte')
     max_total = django_filters.NumberFilter(field_name='total_amount', lookup_expr='lte')
     start_date = django_filters.DateFilter(field_name='order_date', lookup_expr='gte')
@@ -102,20 +162,97 @@ class OrderFilter(django_filters.FilterSet):
         model = Order
         fields = ['customer_name', 'min_total', 'max_total', 'start_date', 'end_date']
 
-class Query(graphene.ObjectType):
-    all_customers = DjangoFilterConnectionField(CustomerType, filterset_class=CustomerFilter)
-    all_products = DjangoFilterConnectionField(ProductType, filterset_class=ProductFilter)
-    all_orders = DjangoFilterConnectionField(OrderType, filterset_class=OrderFilter)
+class StatsInterval(graphene.Enum):
+    DAY = "day"
+    WEEK = "week"
+
+
+class StatsPeriodType(graphene.ObjectType):
+    period = graphene.DateTime()
+    order_count = graphene.Int()
+    revenue = graphene.Decimal()
 
 
-    def resolve_all_customers(root, info):
+class SalesRanking(graphene.Enum):
+    REVENUE = "revenue"
+    UNITS_SOLD = "units_sold"
+
+
+class ProductSalesType(graphene.ObjectType):
+    product = graphene.Field(lambda: ProductType)
+    units_sold = graphene.Int()
+    revenue = graphene.Decimal()
+    order_count = graphene.Int()
+
+
+class CrmStatsType(graphene.ObjectType):
+    customer_count = graphene.Int()
+    order_count = graphene.Int()
+    revenue = graphene.Decimal()
+    breakdown = graphene.List(StatsPeriodType, interval=StatsInterval(required=True))
+    top_products = graphene.List(
+        ProductSalesType,
+        by=SalesRanking(default_value=SalesRanking.REVENUE),
+        limit=graphene.Int(default_value=10),
+    )
+
+    def resolve_breakdown(root, info, interval):
+        # Only grouped when the client selects it
+        if in_event_loop():
+            return aorder_breakdown(interval.value, start=root["start"], end=root["end"])
+        return order_breakdown(interval.value, start=root["start"], end=root["end"])
+
+    def resolve_top_products(root, info, by, limit):
+        max_limit = getattr(settings, "GRAPHQL_MAX_PAGE_SIZE", 100)
+        if not 0 < limit <= max_limit:
+            raise Exception(f"`limit` must be between 1 and {max_limit}.")
+        if in_event_loop():
+            return _atop_products(root, by, limit)
+        rows = product_sales(start=root["start"], end=root["end"], by=by.value, limit=limit)
+        products = Product.objects.in_bulk([row["product_id"] for row in rows])
+        return [dict(row, product=products.get(row["product_id"])) for row in rows]
+
+
+async def _atop_products(root, by, limit):
+    rows = await aproduct_sales(start=root["start"], end=root["end"], by=by.value, limit=limit)
+    products = await Product.objects.ain_bulk([row["product_id"] for row in rows])
+    return [dict(row, product=products.get(row["product_id"])) for row in rows]
+
+
+class Query(graphene.ObjectType):
+    hello = graphene.String(default_value="Hello World!")
+    crm_stats = graphene.Field(CrmStatsType, start=graphene.DateTime(), end=graphene.DateTime())
+    all_customers = KeysetConnectionField(
+        CustomerType, filterset_class=CustomerFilter, ordering=("created_at", "id")
+    )
+    all_products = BatchedFilterConnectionField(ProductType, filterset_class=ProductFilter)
+    all_orders = KeysetConnectionField(
+        OrderType, filterset_class=OrderFilter, ordering=("order_date", "id")
+    )
+
+
+    def resolve_crm_stats(root, info, start=None, end=None):
+        if in_event_loop():
+            return _acrm_stats(start, end)
+        return dict(crm_stats(start=start, end=end), start=start, end=end)
+
+    def resolve_all_customers(root, info, **kwargs):
         return Customer.objects.all()
 
-    def resolve_all_products(root, info):
+    def resolve_all_products(root, info, **kwargs):
         return Product.objects.all()
 
-    def resolve_all_orders(root, info):
-        return Order.objects.select_related("customer").prefetch_related("products").all()
+    def resolve_all_orders(root, info, **kwargs):
+        # Joins and prefetches follow the selection (crm.optimizer)
+        return Order.objects.all()
+
+
+async def _acrm_stats(start, end):
+    return dict(await acrm_stats(start=start, end=end), start=start, end=end)
+
+
+PHONE_PATTERN = re.compile(r'^(\+\d{10,15}|\d{3}-\d{3}-\d{4})$')
+
 
 class CustomerInput(graphene.InputObjectType):
     name = graphene.String(required=True)
@@ -136,10 +273,8 @@ class CreateCustomer(graphene.Mutation):
             raise Exception("Email already exists.")
 
         # Optional phone validation
-        if input.phone:
-            phone_pattern = re.compile(r'^(\+\d{10,15}|\d{3}-\d{3}-\d{4})$')
-            if not phone_pattern.match(input.phone):
-                raise Exception("Invalid phone format.")
+        if input.phone and not PHONE_PATTERN.match(input.phone):
+            raise Exception("Invalid phone format.")
 
         customer = Customer(
             name=input.name,
@@ -153,42 +288,81 @@ class CreateCustomer(graphene.Mutation):
 class BulkCreateCustomers(graphene.Mutation):
     class Arguments:
         inputs = graphene.List(CustomerInput, required=True)
+        chunk_size = graphene.Int(required=False)
 
     customers = graphene.List(lambda: CustomerType)
     errors = graphene.List(graphene.String)
 
-    def mutate(root, info, inputs):
+    def mutate(root, info, inputs, chunk_size=None):
+        if chunk_size is None:
+            chunk_size = getattr(settings, "CRM_BULK_CREATE_CHUNK_SIZE", 1000)
+        if chunk_size <= 0:
+            raise Exception("chunk_size must be positive.")
+
         created_customers = []
         errors = []
+        seen_emails = set()
 
         # Start a transaction for bulk creation
         with transaction.atomic():
-            for idx, input in enumerate(inputs):
-                try:
-                    # Email uniqueness
-                    if Customer.objects.filter(email=input.email).exists():
-                        raise Exception(f"Email already exists: {input.email}")
+            for start in range(0, len(inputs), chunk_size):
+                chunk = inputs[start:start + chunk_size]
+
+                # One uniqueness probe for the whole chunk
+                existing_emails = set(
+                    Customer.objects
+                    .filter(email__in={input.email for input in chunk})
+                    .values_list("email", flat=True)
+                )
+
+                pending = []
+                for idx, input in enumerate(chunk, start=start):
+                    # Email uniqueness, against the database and earlier records
+                    if input.email in existing_emails or input.email in seen_emails:
+                        errors.append((idx, f"Email already exists: {input.email}"))
+                        continue
 
                     # Optional phone validation
-                    if input.phone:
-                        phone_pattern = re.compile(r'^(\+\d{10,15}|\d{3}-\d{3}-\d{4})$')
-                        if not phone_pattern.match(input.phone):
-                            raise Exception(f"Invalid phone format: {input.phone}")
+                    if input.phone and not PHONE_PATTERN.match(input.phone):
+                        errors.append((idx, f"Invalid phone format: {input.phone}"))
+                        continue
 
-                    customer = Customer(
+                    seen_emails.add(input.email)
+                    pending.append((idx, Customer(
                         name=input.name,
                         email=input.email,
                         phone=input.phone
-                    )
-                    customer.save()
-                    created_customers.append(customer)
+                    )))
 
-                except Exception as e:
-                    errors.append(f"Record {idx + 1}: {str(e)}")
-                    # Do not stop the loop — allow other valid records
+                created_customers.extend(_bulk_insert_customers(pending, errors))
 
+        errors = [f"Record {idx + 1}: {message}" for idx, message in sorted(errors)]
         return BulkCreateCustomers(customers=created_customers, errors=errors)
 
+
+def _bulk_insert_customers(pending, errors):
+    """Insert validated customers with one statement, row by row on conflict.
+
+    The uniqueness probe can race with a concurrent insert; in that case the
+    chunk is retried per row so only the conflicting records are reported.
+    """
+    try:
+        with transaction.atomic():
+            return Customer.objects.bulk_create([customer for _, customer in pending])
+    except IntegrityError:
+        pass
+
+    created = []
+    for idx, customer in pending:
+        customer.pk = None
+        try:
+            with transaction.atomic():
+                customer.save()
+            created.append(customer)
+        except IntegrityError:
+            errors.append((idx, f"Email already exists: {customer.email}"))
+    return created
+
 class ProductInput(graphene.InputObjectType):
     name = graphene.String(required=True)
     price = graphene.Float(required=True)
@@ -218,12 +392,63 @@ class CreateProduct(graphene.Mutation):
 
         return CreateProduct(product=product, message="Product created successfully.")
 
+class UpdateLowStockProducts(graphene.Mutation):
+    class Arguments:
+        threshold = graphene.Int(default_value=10)
+        amount = graphene.Int(default_value=10)
+
+    updated_products = graphene.List(lambda: ProductType)
+    message = graphene.String()
+
+    def mutate(root, info, threshold, amount):
+        if amount <= 0:
+            raise Exception("Restock amount must be positive.")
+
+        # One UPDATE for every low-stock product, no per-row save()
+        updated = restock_low_stock(threshold=threshold, amount=amount)
+
+        return UpdateLowStockProducts(
+            updated_products=updated,
+            message=f"{len(updated)} products updated successfully!",
+        )
+
+class OrderItemInput(graphene.InputObjectType):
+    product_id = graphene.ID(required=True)
+    quantity = graphene.Int(default_value=1)
+
+
 class CreateOrderInput(graphene.InputObjectType):
     customer_id = graphene.ID(required=True)
-    product_ids = graphene.List(graphene.ID, required=True)
+    product_ids = graphene.List(graphene.ID)  # one unit of each
+    items = graphene.List(OrderItemInput)  # products with quantities
     order_date = graphene.DateTime(required=False)  # optional
 
 
+def _product_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise Exception(f"Invalid product ID: {value}.")
+
+
+def _order_quantities(input):
+    """Units per integer product id, merging repeated ids and ``items`` lines."""
+    quantities = {}
+    for value in input.product_ids or []:
+        product_id = _product_id(value)
+        quantities[product_id] = quantities.get(product_id, 0) + 1
+    for item in input.items or []:
+        product_id = _product_id(item.product_id)
+        if item.quantity < 1:
+            raise Exception(f"Quantity for product {item.product_id} must be at least 1.")
+        quantities[product_id] = quantities.get(product_id, 0) + item.quantity
+    return quantities
+
+
+def _invalid_ids_message(invalid_ids):
+    return f"Invalid product IDs: {', '.join(str(product_id) for product_id in sorted(invalid_ids))}"
+
+
 class CreateOrder(graphene.Mutation):
     class Arguments:
         input = CreateOrderInput(required=True)
@@ -232,41 +457,176 @@ class CreateOrder(graphene.Mutation):
     message = graphene.String()
 
     def mutate(root, info, input):
-        # Validate customer exists
-        try:
-            customer = Customer.objects.get(id=input.customer_id)
-        except Customer.DoesNotExist:
-            raise Exception(f"Customer ID {input.customer_id} does not exist.")
-
-        # Validate product IDs
-        products = Product.objects.filter(id__in=input.product_ids)
-        if not products.exists():
-            raise Exception("No valid products provided.")
-        if len(products) != len(input.product_ids):
-            invalid_ids = set(input.product_ids) - set(str(p.id) for p in products)
-            raise Exception(f"Invalid product IDs: {', '.join(invalid_ids)}")
-
-        # Set order_date or default to now
-        order_date = input.order_date or timezone.now()
-
-        # Calculate total_amount
-        total_amount = sum(p.price for p in products)
-
-        # Create Order
-        order = Order.objects.create(
-            customer=customer,
-            total_amount=total_amount,
-            order_date=order_date
-        )
-        order.products.set(products)
+        quantities = _order_quantities(input)
+
+        # Validation, stock reservation and the inserts commit or fail together
+        with transaction.atomic():
+            # Validate customer exists
+            try:
+                customer = Customer.objects.get(id=input.customer_id)
+            except Customer.DoesNotExist:
+                raise Exception(f"Customer ID {input.customer_id} does not exist.")
+
+            # Validate product IDs, locking the rows in id order so that
+            # concurrent orders for the same products queue instead of deadlocking
+            products = list(
+                Product.objects.select_for_update().filter(id__in=quantities).order_by("id")
+            )
+            if not products:
+                raise Exception("No valid products provided.")
+            if len(products) != len(quantities):
+                raise Exception(_invalid_ids_message(set(quantities) - {p.id for p in products}))
+
+            lines = [(product, quantities[product.id]) for product in products]
+            reserve_stock(lines)
+
+            # Set order_date or default to now
+            order_date = input.order_date or timezone.now()
+
+            # Calculate total_amount and the counters from the lines
+            total_amount, item_count, unit_count = order_totals(lines)
+
+            # Create Order with its line items
+            order = Order.objects.create(
+                customer=customer,
+                total_amount=total_amount,
+                order_date=order_date,
+                item_count=item_count,
+                unit_count=unit_count,
+            )
+            items = OrderItem.objects.bulk_create(build_order_items(order, lines))
+
+        # The payload's nested customer/products/items need no further queries
+        loaders = get_loaders(info)
+        loaders.customer.set(customer.id, customer)
+        loaders.order_items.set(order.id, items)
+        loaders.order_products.set(order.id, OrderProductsLoader.products_of(items))
 
         return CreateOrder(order=order, message="Order created successfully.")
 
 
 
 
+class BulkCreateOrders(graphene.Mutation):
+    class Arguments:
+        inputs = graphene.List(CreateOrderInput, required=True)
+        chunk_size = graphene.Int(required=False)
+
+    orders = graphene.List(lambda: OrderType)
+    errors = graphene.List(graphene.String)
+
+    def mutate(root, info, inputs, chunk_size=None):
+        if chunk_size is None:
+            chunk_size = getattr(settings, "CRM_BULK_CREATE_CHUNK_SIZE", 1000)
+        if chunk_size <= 0:
+            raise Exception("chunk_size must be positive.")
+
+        created_orders = []
+        created_items = {}
+        errors = []
+
+        quantities = []
+        for idx, input in enumerate(inputs):
+            try:
+                quantities.append(_order_quantities(input))
+            except Exception as e:
+                errors.append((idx, str(e)))
+                quantities.append(None)
+
+        with transaction.atomic():
+            # One query each for every customer and product in the batch;
+            # products are locked in id order as in CreateOrder
+            customer_ids = {str(input.customer_id) for input in inputs}
+            customers = {
+                str(customer.id): customer
+                for customer in Customer.objects.filter(id__in=[i for i in customer_ids if i.isdigit()])
+            }
+            product_ids = set().union(*(q for q in quantities if q))
+            products = {
+                product.id: product
+                for product in Product.objects.select_for_update().filter(id__in=product_ids).order_by("id")
+            }
+            available = {product_id: product.stock for product_id, product in products.items()}
+
+            for start in range(0, len(inputs), chunk_size):
+                pending = []
+                for idx in range(start, min(start + chunk_size, len(inputs))):
+                    input, order_quantities = inputs[idx], quantities[idx]
+                    if order_quantities is None:
+                        continue
+
+                    customer = customers.get(str(input.customer_id))
+                    if customer is None:
+                        errors.append((idx, f"Customer ID {input.customer_id} does not exist."))
+                        continue
+
+                    invalid_ids = set(order_quantities) - set(products)
+                    if len(invalid_ids) == len(order_quantities):
+                        errors.append((idx, "No valid products provided."))
+                        continue
+                    if invalid_ids:
+                        errors.append((idx, _invalid_ids_message(invalid_ids)))
+                        continue
+
+                    lines = [(products[product_id], quantity) for product_id, quantity in order_quantities.items()]
+                    short = [
+                        f"{product.name} (requested {quantity}, available {available[product.id]})"
+                        for product, quantity in lines
+                        if available[product.id] < quantity
+                    ]
+                    if short:
+                        errors.append((idx, f"Insufficient stock for {', '.join(short)}."))
+                        continue
+                    for product, quantity in lines:
+                        available[product.id] -= quantity
+
+                    total_amount, item_count, unit_count = order_totals(lines)
+                    pending.append((customer, lines, Order(
+                        customer=customer,
+                        total_amount=total_amount,
+                        order_date=input.order_date or timezone.now(),
+                        item_count=item_count,
+                        unit_count=unit_count,
+                    )))
+
+                if not pending:
+                    continue
+
+                # One guarded stock UPDATE, one orders INSERT and one items INSERT per chunk
+                reserved = {}
+                for _, lines, _ in pending:
+                    for product, quantity in lines:
+                        reserved[product] = reserved.get(product, 0) + quantity
+                reserve_stock(sorted(reserved.items(), key=lambda line: line[0].id))
+
+                orders = Order.objects.bulk_create([order for _, _, order in pending])
+                items = OrderItem.objects.bulk_create([
+                    item
+                    for order, (_, lines, _) in zip(orders, pending)
+                    for item in build_order_items(order, lines)
+                ])
+                for item in items:
+                    created_items.setdefault(item.order_id, []).append(item)
+                created_orders.extend(orders)
+
+        # The payload's nested customer/products/items need no further queries
+        loaders = get_loaders(info)
+        for order in created_orders:
+            loaders.customer.set(order.customer_id, order.customer)
+            loaders.order_items.set(order.id, created_items.get(order.id, []))
+            loaders.order_products.set(order.id, OrderProductsLoader.products_of(created_items.get(order.id, [])))
+
+        errors = [f"Record {idx + 1}: {message}" for idx, message in sorted(errors)]
+        return BulkCreateOrders(orders=created_orders, errors=errors)
+
+
 class Mutation(graphene.ObjectType):
     create_customer = CreateCustomer.Field()
     bulk_create_customers = BulkCreateCustomers.Field()
     create_product = CreateProduct.Field()
-    create_order = CreateOrder.Field()
\ No newline at end of file
+    create_order = CreateOrder.Field()
+    bulk_create_orders = BulkCreateOrders.Field()
+    update_low_stock_products = UpdateLowStockProducts.Field()
+
+
+schema = graphene.Schema(query=Query, mutation=Mutation)
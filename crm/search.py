@@ -0,0 +1,200 @@
+"""Pluggable text search behind the CRM ``icontains`` filters.
+
+``LIKE '%x%'`` cannot use a B-tree index, so every keystroke in a search box
+scans the whole table. The backends here answer the same substring question
+from an index instead:
+
+* SQLite: FTS5 virtual tables with the ``trigram`` tokenizer, kept in sync by
+  triggers on ``crm_customer`` and ``crm_product``.
+* PostgreSQL: ``pg_trgm`` GIN indexes on ``UPPER(column)``, which is exactly
+  the expression Django's ``icontains`` compiles to.
+* Anything else (or terms shorter than a trigram): plain ``icontains``.
+
+``CRM_SEARCH_BACKEND`` may name another backend class by dotted path.
+"""
+import functools
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Customer, Product
+
+# Columns indexed for search, per model
+SEARCH_FIELDS = {
+    Customer: ("name", "email", "phone"),
+    Product: ("name",),
+}
+
+# Trigram indexes need at least this many characters to narrow anything
+MIN_TERM_LENGTH = 3
+
+
+def _resolve_path(model, path):
+    """Split ``customer__name`` into ``("customer__", Customer, "name")``."""
+    *relations, field_name = path.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    prefix = "".join(f"{relation}__" for relation in relations)
+    return prefix, model, field_name
+
+
+def _contains_any(fields, term):
+    matches = Q()
+    for field in fields:
+        matches |= Q(**{f"{field}__icontains": term})
+    return matches
+
+
+class SearchBackend:
+    """Substring filtering and ranking with ``icontains``."""
+
+    def filter_contains(self, queryset, path, term):
+        return queryset.filter(**{f"{path}__icontains": term})
+
+    def search(self, queryset, term):
+        """Rows of ``queryset`` matching ``term``, annotated with ``search_rank``.
+
+        Lower ranks are better matches. The rank is computed by the query
+        that finds the rows, so ordering by it and slicing a page limits the
+        work like any other ``ORDER BY ... LIMIT``.
+        """
+        fields = SEARCH_FIELDS[queryset.model]
+        starts = Q()
+        for field in fields:
+            starts |= Q(**{f"{field}__istartswith": term})
+        # Prefix matches first
+        prefix = Case(When(starts, then=Value(0)), default=Value(1), output_field=IntegerField())
+        return queryset.filter(_contains_any(fields, term)).annotate(search_rank=prefix)
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """FTS5 trigram tables, ranked by bm25."""
+
+    @staticmethod
+    def fts_table(model):
+        return f"{model._meta.db_table}_fts"
+
+    @staticmethod
+    def quote(term):
+        return '"{}"'.format(term.replace('"', '""'))
+
+    def filter_contains(self, queryset, path, term):
+        prefix, model, field_name = _resolve_path(queryset.model, path)
+        if model not in SEARCH_FIELDS or field_name not in SEARCH_FIELDS[model] or len(term) < MIN_TERM_LENGTH:
+            return super().filter_contains(queryset, path, term)
+
+        table = self.fts_table(model)
+        column = model._meta.get_field(field_name).column
+        matches = RawSQL(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH %s",
+            [f"{column} : {self.quote(term)}"],
+        )
+        return queryset.filter(**{f"{prefix}pk__in": matches})
+
+    def search(self, queryset, term):
+        if len(term) < MIN_TERM_LENGTH:
+            return super().search(queryset, term)
+        # One query: the FTS table (CustomerSearchRow, ProductSearchRow)
+        # yields the matches with their bm25 rank and joins the rows on rowid
+        return queryset.filter(search_row__text__match=self.quote(term)).annotate(
+            search_rank=F("search_row__rank")
+        )
+
+
+class PostgresTrigramBackend(SearchBackend):
+    """``icontains`` served by pg_trgm GIN indexes, ranked by similarity."""
+
+    def search(self, queryset, term):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        from django.db.models.functions import Greatest
+
+        fields = SEARCH_FIELDS[queryset.model]
+        similarities = [TrigramWordSimilarity(term, field) for field in fields]
+        similarity = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        # Most similar first
+        return queryset.filter(_contains_any(fields, term)).annotate(
+            search_rank=Value(1.0) - similarity
+        )
+
+
+def sqlite_fts_available(conn=connection):
+    """Whether this SQLite build has FTS5 with the trigram tokenizer."""
+    if conn.Database.sqlite_version_info < (3, 34):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+@functools.lru_cache(maxsize=None)
+def _default_backend(vendor):
+    if vendor == "sqlite" and sqlite_fts_available():
+        return SQLiteFTSBackend()
+    if vendor == "postgresql":
+        return PostgresTrigramBackend()
+    return SearchBackend()
+
+
+def get_search_backend():
+    path = getattr(settings, "CRM_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    return _default_backend(connection.vendor)
+
+
+# === Index maintenance ===
+
+def _sqlite_statements(model):
+    table = model._meta.db_table
+    fts = SQLiteFTSBackend.fts_table(model)
+    columns = [model._meta.get_field(name).column for name in SEARCH_FIELDS[model]]
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{names}, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END",
+        # Only edits of indexed columns touch the index, not e.g. stock updates
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+def install_search_indexes(conn):
+    """Create the SQLite FTS tables and sync triggers; safe to run repeatedly.
+
+    On SQLite a table rebuild by a later migration drops the sync triggers,
+    so this also runs after every ``migrate`` and rebuilds the FTS contents
+    whenever triggers had to be recreated. The PostgreSQL indexes only come
+    from migration 0003.
+    """
+    if not sqlite_fts_available(conn):
+        return
+    with conn.cursor() as cursor:
+        for model in SEARCH_FIELDS:
+            fts = SQLiteFTSBackend.fts_table(model)
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f"{fts}_a%"],
+            )
+            complete = cursor.fetchone()[0] == 3
+            for statement in _sqlite_statements(model):
+                cursor.execute(statement)
+            if not complete:
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def repair_search_indexes(conn):
+    """Recreate SQLite sync triggers dropped by a table rebuild, if installed."""
+    if conn.vendor != "sqlite":
+        return
+    if SQLiteFTSBackend.fts_table(Customer) in conn.introspection.table_names():
+        install_search_indexes(conn)
@@ -0,0 +1,214 @@
+"""Set-based CRM operations shared by the GraphQL mutations and the jobs."""
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDay, TruncWeek
+
+from .models import Customer, Order, OrderItem, Product
+from .signals import products_changed
+
+CENTS = Decimal("0.01")
+
+STATS_INTERVALS = {
+    "day": TruncDay,
+    "week": TruncWeek,
+}
+
+STATS_AGGREGATES = {
+    "order_count": Count("id"),
+    "revenue": Sum("total_amount"),
+}
+
+SALES_RANKINGS = ("revenue", "units_sold")
+
+
+class OutOfStock(Exception):
+    """An order asked for more units than a product has in stock."""
+
+
+def _update_returning_supported():
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def restock_low_stock(threshold=10, amount=10):
+    """Add ``amount`` to every product with ``stock < threshold``.
+
+    The increment happens in one ``UPDATE ... SET stock = stock + amount``
+    so concurrent orders never race a read-modify-write. Where the database
+    supports ``UPDATE ... RETURNING`` the restocked rows come back from the
+    same statement; elsewhere they are locked, updated and re-read inside one
+    transaction. Returns the restocked products ordered by id.
+    """
+    if _update_returning_supported():
+        opts = Product._meta
+        qn = connection.ops.quote_name
+        columns = [field.column for field in opts.concrete_fields]
+        stock = qn(opts.get_field("stock").column)
+        sql = (
+            f"UPDATE {qn(opts.db_table)} SET {stock} = {stock} + %s "
+            f"WHERE {stock} < %s "
+            f"RETURNING {', '.join(qn(column) for column in columns)}"
+        )
+        # raw() applies the backend's converters (e.g. SQLite's to Decimal)
+        with transaction.atomic():
+            products = list(Product.objects.raw(sql, [amount, threshold]))
+        if products:
+            products_changed.send(sender=Product)
+        return sorted(products, key=lambda product: product.pk)
+
+    with transaction.atomic():
+        low_stock = Product.objects.select_for_update().filter(stock__lt=threshold)
+        ids = list(low_stock.values_list("id", flat=True))
+        Product.objects.filter(id__in=ids).update(stock=F("stock") + amount)
+        products = Product.objects.in_bulk(ids)
+    if ids:
+        products_changed.send(sender=Product)
+    return [products[pk] for pk in sorted(products)]
+
+
+def _window(queryset, field, start=None, end=None):
+    if start is not None:
+        queryset = queryset.filter(**{f"{field}__gte": start})
+    if end is not None:
+        queryset = queryset.filter(**{f"{field}__lt": end})
+    return queryset
+
+
+def crm_stats(start=None, end=None):
+    """Customer count, order count and Decimal revenue for a date window.
+
+    ``start`` is inclusive and ``end`` exclusive; either may be omitted.
+    Orders and revenue come from a single ``aggregate()`` and customers from
+    a ``COUNT(*)``, so the cost does not grow with the order history.
+    """
+    totals = _window(Order.objects, "order_date", start, end).aggregate(**STATS_AGGREGATES)
+    return _stats(_window(Customer.objects, "created_at", start, end).count(), totals)
+
+
+async def acrm_stats(start=None, end=None):
+    """``crm_stats`` with Django's async ORM methods."""
+    totals = await _window(Order.objects, "order_date", start, end).aaggregate(**STATS_AGGREGATES)
+    return _stats(await _window(Customer.objects, "created_at", start, end).acount(), totals)
+
+
+def _stats(customer_count, totals):
+    return {
+        "customer_count": customer_count,
+        "order_count": totals["order_count"],
+        "revenue": (totals["revenue"] or Decimal("0")).quantize(CENTS),
+    }
+
+
+def _breakdown_rows(interval, start, end):
+    trunc = STATS_INTERVALS[interval]
+    return (
+        _window(Order.objects, "order_date", start, end)
+        .annotate(period=trunc("order_date"))
+        .values("period")
+        .annotate(order_count=Count("id"), revenue=Sum("total_amount"))
+        .order_by("period")
+    )
+
+
+def order_breakdown(interval, start=None, end=None):
+    """Order count and revenue per ``"day"`` or ``"week"``, oldest first."""
+    return [dict(row, revenue=row["revenue"].quantize(CENTS)) for row in _breakdown_rows(interval, start, end)]
+
+
+async def aorder_breakdown(interval, start=None, end=None):
+    return [
+        dict(row, revenue=row["revenue"].quantize(CENTS))
+        async for row in _breakdown_rows(interval, start, end)
+    ]
+
+
+def reserve_stock(lines):
+    """Take ``quantity`` units of each ``(product, quantity)`` line out of stock.
+
+    Callers lock the product rows first (``select_for_update`` ordered by id,
+    so concurrent orders queue up instead of deadlocking) and pass the
+    locked instances. Every line is then decremented by one ``UPDATE``
+    guarded by ``stock >= quantity`` per row, so stock cannot go negative
+    even where row locks are unavailable; if any row fails the guard
+    nothing is reserved. Raises ``OutOfStock``.
+    """
+    short = [
+        f"{product.name} (requested {quantity}, available {product.stock})"
+        for product, quantity in lines
+        if product.stock < quantity
+    ]
+    if short:
+        raise OutOfStock(f"Insufficient stock for {', '.join(short)}.")
+
+    requested = Case(
+        *(When(pk=product.pk, then=Value(quantity)) for product, quantity in lines),
+        output_field=IntegerField(),
+    )
+    with transaction.atomic():
+        updated = Product.objects.filter(
+            pk__in=[product.pk for product, _ in lines], stock__gte=requested
+        ).update(stock=F("stock") - requested)
+        if updated != len(lines):
+            raise OutOfStock("Insufficient stock: a product sold out while the order was placed.")
+        products_changed.send(sender=Product)
+
+    for product, quantity in lines:
+        product.stock -= quantity
+
+
+def order_totals(lines):
+    """``(total_amount, item_count, unit_count)`` for ``(product, quantity)`` lines."""
+    total = sum((product.price * quantity for product, quantity in lines), Decimal("0"))
+    return total, len(lines), sum(quantity for _, quantity in lines)
+
+
+def build_order_items(order, lines):
+    """Unsaved items for a saved ``order``, priced at the products' current price."""
+    return [
+        OrderItem(
+            order=order,
+            product=product,
+            quantity=quantity,
+            unit_price=product.price,
+            order_date=order.order_date,
+        )
+        for product, quantity in lines
+    ]
+
+
+def _product_sales_rows(start, end, by, limit):
+    return (
+        _window(OrderItem.objects, "order_date", start, end)
+        .values("product_id")
+        .annotate(
+            units_sold=Sum("quantity"),
+            revenue=Sum(F("quantity") * F("unit_price"), output_field=DecimalField()),
+            order_count=Count("order_id"),
+        )
+        .order_by(f"-{by}", "product_id")[:limit]
+    )
+
+
+def product_sales(start=None, end=None, by="revenue", limit=10):
+    """Best-selling products in a date window, by ``"revenue"`` or ``"units_sold"``.
+
+    One ``GROUP BY`` over the line items using their price and date
+    snapshots; neither orders nor products are joined, and the window is
+    served by ``crm_orderitem_date_idx``.
+    """
+    return [
+        dict(row, revenue=row["revenue"].quantize(CENTS))
+        for row in _product_sales_rows(start, end, by, limit)
+    ]
+
+
+async def aproduct_sales(start=None, end=None, by="revenue", limit=10):
+    return [
+        dict(row, revenue=row["revenue"].quantize(CENTS))
+        async for row in _product_sales_rows(start, end, by, limit)
+    ]
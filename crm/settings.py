@@ -1,6 +1,5 @@
 import os
 from pathlib import Path
-from celery.schedules import crontab
 
 # Base directory
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,9 +20,6 @@ INSTALLED_APPS = [
     # GraphQL
     "graphene_django",
 
-    # Cron jobs
-    "django_crontab",
-
     # Your CRM app(s)
     "crm",
     "django_celery_beat",
@@ -31,16 +27,6 @@ INSTALLED_APPS = [
 
 
 CELERY_BROKER_URL = "redis://localhost:6379/0"
-CELERY_BEAT_SCHEDULE = {
-    "generate-crm-report": {
-        "task": "crm.tasks.generate_crm_report",
-        "schedule": {
-            "day_of_week": "mon",
-            "hour": 6,
-            "minute": 0
-        },
-    },
-}
 
 
 MIDDLEWARE = [
@@ -104,11 +90,14 @@ GRAPHENE = {
     "SCHEMA": "crm.schema.schema",  # where your GraphQL schema is
 }
 
-# Cron jobs
-CRONJOBS = [
-    ("*/5 * * * *", "crm.cron.log_crm_heartbeat"),  # heartbeat logger
-   
-    ("*/5 * * * *", "crm.cron.log_crm_heartbeat"),   # Task 2
-    ("0 */12 * * *", "crm.cron.update_low_stock"),   # Task 3
-]
+# How cron/Celery jobs run GraphQL: "local" (in-process) or "http"
+CRM_GRAPHQL_TRANSPORT = "local"
+CRM_GRAPHQL_URL = "http://localhost:8000/graphql"
+CRM_GRAPHQL_SCHEMA_CACHE_TTL = 24 * 60 * 60  # introspection cache, used without crm/schema.graphql
+
+# Periodic jobs, run by `python manage.py run_scheduler`: crm.scheduler.DEFAULT_JOBS unless CRM_SCHEDULER_JOBS is set
+CRM_SCHEDULER_JITTER = 30  # seconds; each run starts up to this long after its slot
+CRM_JOB_LOG_MAX_BYTES = 10 * 1024 * 1024  # a job log rotates to <path>.1 past this size
+CRM_JOB_LOG_BACKUP_COUNT = 5  # rotated files kept per job log
+CRM_JOB_LOG_JSON = False  # job logs as JSON lines instead of text
 
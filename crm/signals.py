@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent when product rows change through queryset updates or raw SQL (stock
+# reservations, restocks), which do not fire post_save. Receivers are
+# connected by whoever caches product data, e.g. alx_backend_graphql.apps.
+products_changed = Signal()
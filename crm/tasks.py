@@ -1,47 +1,39 @@
 import logging
-from datetime import datetime
+from decimal import Decimal
 from celery import shared_task
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+
+from crm.executor import JobDocument, get_executor
+from crm.joblog import JobLog
 
 logger = logging.getLogger(__name__)
 
-@shared_task
-def generate_crm_report():
-    # Setup GraphQL client
-    transport = RequestsHTTPTransport(
-        url="http://localhost:8000/graphql/",
-        use_json=True,
-    )
-    client = Client(transport=transport, fetch_schema_from_transport=True)
+REPORT_LOG = JobLog("crm_report", "/tmp/crm_report_log.txt")
 
-    query = gql("""
+# Totals are aggregated in the database, so the cost of a run does not
+# grow with the order history
+CRM_STATS_QUERY = JobDocument("""
     query {
-        allCustomers {
-            totalCount
-        }
-        allOrders {
-            totalCount
-            edges {
-                node {
-                    totalAmount
-                }
-            }
+        crmStats {
+            customerCount
+            orderCount
+            revenue
         }
     }
-    """)
+""")
 
-    result = client.execute(query)
+@shared_task
+def generate_crm_report():
+    result = get_executor().execute(CRM_STATS_QUERY)
 
-    customers = result["allCustomers"]["totalCount"]
-    orders = result["allOrders"]["totalCount"]
-    revenue = sum(float(edge["node"]["totalAmount"]) for edge in result["allOrders"]["edges"])
+    stats = result["crmStats"]
+    customers = stats["customerCount"]
+    orders = stats["orderCount"]
+    revenue = Decimal(stats["revenue"])
 
     # Log to file
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_line = f"{timestamp} - Report: {customers} customers, {orders} orders, {revenue} revenue\n"
-
-    with open("/tmp/crm_report_log.txt", "a") as f:
-        f.write(log_line)
+    REPORT_LOG.write(
+        f"Report: {customers} customers, {orders} orders, {revenue} revenue",
+        customers=customers, orders=orders, revenue=revenue,
+    )
 
     logger.info("CRM report generated and logged.")
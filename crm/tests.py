@@ -1,3 +1,1396 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import nullcontext
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Permission, User
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.signals import post_delete
+from django.http import StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLSyntaxError, get_operation_ast, parse, print_ast, validate
+
+from alx_backend_graphql.cost import QueryCostError, analyze_query_cost
+from alx_backend_graphql.document_cache import DocumentCache
+from alx_backend_graphql.response_cache import invalidate_responses
+from alx_backend_graphql.tracing import ResolverTracer
+from alx_backend_graphql.views import CRMGraphQLView
+
+from . import executor
+from .executor import GraphQLExecutionError, HTTPExecutor, JobDocument, LocalExecutor, get_executor
+from .joblog import JobLog
+from .loaders import CustomerLoader, OrderItemsLoader
+from .models import Customer, JobCursor, Order, OrderItem, Product
+from .reminders import REMINDER_CURSOR, send_order_reminders
+from .search import get_search_backend
+from .scheduler import CronSchedule, ScheduledJob, Scheduler
+from .schema import schema
+from .services import crm_stats, restock_low_stock
+
+CREATE_ORDER = """
+mutation CreateOrder($input: CreateOrderInput!) {
+  createOrder(input: $input) { order { id unitCount } }
+}
+"""
+
+
+def create_order(customer, product, quantity):
+    return schema.execute(
+        CREATE_ORDER,
+        variable_values={
+            "input": {
+                "customerId": str(customer.id),
+                "items": [{"productId": str(product.id), "quantity": quantity}],
+            }
+        },
+    )
+
+
+class CreateOrderStockTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        self.product = Product.objects.create(name="Widget", price="2.50", stock=5)
+
+    def test_reserves_stock(self):
+        result = create_order(self.customer, self.product, 2)
+
+        self.assertIsNone(result.errors)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+        self.assertEqual(OrderItem.objects.get().quantity, 2)
+
+    def test_out_of_stock_creates_nothing(self):
+        result = create_order(self.customer, self.product, 6)
+
+        self.assertEqual(
+            result.errors[0].message, "Insufficient stock for Widget (requested 6, available 5)."
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+        self.assertFalse(Order.objects.exists())
+
+    def test_product_ids_are_matched_as_numbers(self):
+        product_id = f"0{self.product.id}"
+        result = schema.execute(CREATE_ORDER, variable_values={"input": {
+            "customerId": str(self.customer.id),
+            "productIds": [product_id],
+            "items": [{"productId": product_id, "quantity": 2}],
+        }})
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(OrderItem.objects.get().quantity, 3)
+
+    def test_non_numeric_product_id(self):
+        result = schema.execute(CREATE_ORDER, variable_values={"input": {
+            "customerId": str(self.customer.id), "productIds": ["widget"],
+        }})
+
+        self.assertEqual(result.errors[0].message, "Invalid product ID: widget.")
+        self.assertFalse(Order.objects.exists())
+
+
+class CreateOrderConcurrencyTests(TransactionTestCase):
+    stock = 10
+    workers = 40
+
+    def test_parallel_orders_never_oversell(self):
+        customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        product = Product.objects.create(name="Flash sale SKU", price="9.99", stock=self.stock)
+        barrier = threading.Barrier(self.workers)
+        results = []
+        lock = threading.Lock()
+
+        def place_order():
+            try:
+                barrier.wait()
+                result = create_order(customer, product, 1)
+                with lock:
+                    results.append(result)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=place_order) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        sold = sum(1 for result in results if not result.errors)
+        product.refresh_from_db()
+        self.assertGreaterEqual(product.stock, 0)
+        self.assertEqual(product.stock + sold, self.stock)
+        self.assertEqual(OrderItem.objects.filter(product=product).count(), sold)
+        self.assertEqual(Order.objects.count(), sold)
+        if connection.features.has_select_for_update:
+            # Orders queue on the row lock: every unit sells exactly once and
+            # everyone else is told it ran out
+            self.assertEqual(sold, self.stock)
+            for result in results:
+                if result.errors:
+                    self.assertIn("Insufficient stock", result.errors[0].message)
+
+
+class BulkCreateCustomersTests(TestCase):
+    mutation = """
+    mutation Bulk($inputs: [CustomerInput]!, $chunkSize: Int) {
+      bulkCreateCustomers(inputs: $inputs, chunkSize: $chunkSize) { customers { email } errors }
+    }
+    """
+
+    def setUp(self):
+        Customer.objects.create(name="Alice", email="alice@example.com")
+
+    def bulk_create(self, inputs, chunk_size=None):
+        result = schema.execute(self.mutation, variable_values={"inputs": inputs, "chunkSize": chunk_size})
+        self.assertIsNone(result.errors)
+        payload = result.data["bulkCreateCustomers"]
+        return [customer["email"] for customer in payload["customers"]], payload["errors"]
+
+    def test_reports_invalid_records_in_input_order(self):
+        created, errors = self.bulk_create([
+            {"name": "Bob", "email": "bob@example.com", "phone": "555-123-4567"},
+            {"name": "Bob again", "email": "bob@example.com"},
+            {"name": "Alice", "email": "alice@example.com"},
+            {"name": "Carol", "email": "carol@example.com", "phone": "12345"},
+            {"name": "Dan", "email": "dan@example.com", "phone": "+15551234567"},
+        ], chunk_size=2)
+
+        self.assertEqual(created, ["bob@example.com", "dan@example.com"])
+        self.assertEqual(errors, [
+            "Record 2: Email already exists: bob@example.com",
+            "Record 3: Email already exists: alice@example.com",
+            "Record 4: Invalid phone format: 12345",
+        ])
+        self.assertEqual(Customer.objects.count(), 3)
+
+    def test_rows_inserted_after_the_probe_are_reported_not_fatal(self):
+        # Carol is committed by someone else after the uniqueness probe ran
+        Customer.objects.create(name="Carol", email="carol@example.com")
+        with mock.patch.object(Customer.objects, "filter", return_value=Customer.objects.none()):
+            created, errors = self.bulk_create([
+                {"name": "Carol", "email": "carol@example.com"},
+                {"name": "Dan", "email": "dan@example.com", "phone": "nope"},
+                {"name": "Erin", "email": "erin@example.com"},
+            ])
+
+        self.assertEqual(created, ["erin@example.com"])
+        self.assertEqual(errors, [
+            "Record 1: Email already exists: carol@example.com",
+            "Record 2: Invalid phone format: nope",
+        ])
+        self.assertEqual(Customer.objects.filter(email="erin@example.com").count(), 1)
+
+
+class BulkCreateOrdersTests(TestCase):
+    def test_creates_valid_records_and_reports_the_rest(self):
+        customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        product = Product.objects.create(name="Widget", price="2.50", stock=3)
+        inputs = [
+            {"customerId": str(customer.id), "items": [{"productId": str(product.id), "quantity": 2}]},
+            {"customerId": "999999", "productIds": [str(product.id)]},
+            {"customerId": str(customer.id), "items": [{"productId": str(product.id), "quantity": 2}]},
+            {"customerId": str(customer.id), "productIds": [str(product.id)]},
+        ]
+
+        result = schema.execute(
+            """
+            mutation BulkCreateOrders($inputs: [CreateOrderInput]!) {
+              bulkCreateOrders(inputs: $inputs, chunkSize: 2) { orders { totalAmount } errors }
+            }
+            """,
+            variable_values={"inputs": inputs},
+        )
+
+        self.assertIsNone(result.errors)
+        payload = result.data["bulkCreateOrders"]
+        self.assertEqual([order["totalAmount"] for order in payload["orders"]], ["5.00", "2.50"])
+        self.assertEqual(payload["errors"], [
+            "Record 2: Customer ID 999999 does not exist.",
+            "Record 3: Insufficient stock for Widget (requested 2, available 1).",
+        ])
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+
+    def test_rejects_non_positive_chunk_sizes(self):
+        for mutation, argument in (("bulkCreateCustomers", "CustomerInput"),
+                                   ("bulkCreateOrders", "CreateOrderInput")):
+            for chunk_size in (0, -1):
+                with self.subTest(mutation=mutation, chunk_size=chunk_size):
+                    result = schema.execute(
+                        f"""
+                        mutation Bulk($inputs: [{argument}]!, $chunkSize: Int) {{
+                          {mutation}(inputs: $inputs, chunkSize: $chunkSize) {{ errors }}
+                        }}
+                        """,
+                        variable_values={"inputs": [], "chunkSize": chunk_size},
+                    )
+                    self.assertEqual(result.errors[0].message, "chunk_size must be positive.")
+
+
+class UpdateLowStockProductsTests(TestCase):
+    def test_restocks_below_threshold_and_returns_the_products(self):
+        low = Product.objects.create(name="Widget", price="2.50", stock=4)
+        Product.objects.create(name="Gadget", price="40.00", stock=5)
+
+        result = schema.execute("""
+            mutation {
+              updateLowStockProducts(threshold: 5, amount: 7) {
+                message updatedProducts { id stock price }
+              }
+            }
+        """)
+
+        self.assertIsNone(result.errors)
+        payload = result.data["updateLowStockProducts"]
+        self.assertEqual(payload["message"], "1 products updated successfully!")
+        self.assertEqual(payload["updatedProducts"], [{"id": str(low.pk), "stock": 11, "price": "2.50"}])
+
+
+def create_orders(customers, orders_per_customer=2):
+    """``customers`` new customers with ``orders_per_customer`` one-item orders each."""
+    product = Product.objects.create(name="Widget", price="2.50", stock=100)
+    for i in range(customers):
+        customer = Customer.objects.create(name=f"C{i}", email=f"c{i}-{product.pk}@example.com")
+        for _ in range(orders_per_customer):
+            order = Order.objects.create(customer=customer, total_amount="2.50")
+            OrderItem.objects.create(
+                order=order, product=product, quantity=1, unit_price="2.50",
+                order_date=order.order_date,
+            )
+
+
+def unoptimized(queryset, info, required_fields=()):
+    return queryset
+
+
+class LoaderQueryCountTests(TestCase):
+    def post(self, query):
+        response = self.client.post(
+            "/graphql", json.dumps({"query": query}), content_type="application/json"
+        )
+        payload = json.loads(response.content)
+        self.assertNotIn("errors", payload)
+        return payload["data"]
+
+    def assert_constant_queries(self, query, root, expected):
+        # Connection pages prefetch; without the optimizer the loaders batch
+        for optimized in (True, False):
+            patch = nullcontext() if optimized else mock.patch(
+                "crm.loaders.optimize_queryset", unoptimized
+            )
+            with self.subTest(optimized=optimized), patch:
+                for customers in (2, 6):
+                    Order.objects.all().delete()
+                    Customer.objects.all().delete()
+                    create_orders(customers)
+                    with self.assertNumQueries(expected[optimized]):
+                        data = self.post(query)
+                    self.assertTrue(data[root]["edges"])
+
+    def test_customer_orders_products(self):
+        self.assert_constant_queries(
+            "{ allCustomers(first: 20) { edges { node { name orders { totalAmount products { name } } } } } }",
+            "allCustomers", {True: 3, False: 3},
+        )
+
+    def test_order_customer_products(self):
+        self.assert_constant_queries(
+            "{ allOrders(first: 20) { edges { node { customer { name } products { name } } } } }",
+            "allOrders", {True: 2, False: 3},
+        )
+
+
+    def test_products_come_in_the_same_order_from_every_path(self):
+        customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        widget = Product.objects.create(name="Widget", price="2.50", stock=5)
+        gadget = Product.objects.create(name="Gadget", price="4.00", stock=5)
+        order = Order.objects.create(customer=customer, total_amount="6.50")
+        # Lines in the reverse of product id order
+        for product in (gadget, widget):
+            OrderItem.objects.create(order=order, product=product, unit_price=product.price,
+                                     order_date=order.order_date)
+
+        query = "{ allOrders(first: 5) { edges { node { products { name } } } } }"
+        for optimized in (True, False):
+            patch = nullcontext() if optimized else mock.patch("crm.loaders.optimize_queryset", unoptimized)
+            with self.subTest(optimized=optimized), patch:
+                [edge] = self.post(query)["allOrders"]["edges"]
+                self.assertEqual(edge["node"]["products"], [{"name": "Widget"}, {"name": "Gadget"}])
+
+
+class AsyncGraphQLViewTests(TransactionTestCase):
+    async def post(self, url, query):
+        response = await self.async_client.post(
+            url, json.dumps({"query": query}), content_type="application/json"
+        )
+        return response.status_code, json.loads(response.content)
+
+    async def test_matches_sync_view(self):
+        customer = await Customer.objects.acreate(name="Alice", email="alice@example.com")
+        product = await Product.objects.acreate(name="Widget", price="2.50", stock=5)
+        order = await Order.objects.acreate(customer=customer, total_amount="5.00")
+        await OrderItem.objects.acreate(
+            order=order, product=product, quantity=2, unit_price="2.50", order_date=order.order_date
+        )
+        query = """
+        {
+          allCustomers { totalCount edges { node { name orders { totalAmount } } } }
+          allOrders { edges { node { customer { name } items { quantity product { name } } } } }
+          crmStats { orderCount }
+        }
+        """
+
+        status, payload = await self.post("/graphql/async", query)
+        sync_response = await self.async_client.post(
+            "/graphql", json.dumps({"query": query}), content_type="application/json"
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["data"], json.loads(sync_response.content)["data"])
+        self.assertEqual(
+            payload["data"]["allOrders"]["edges"][0]["node"],
+            {"customer": {"name": "Alice"}, "items": [{"quantity": 2, "product": {"name": "Widget"}}]},
+        )
+
+    async def test_loaders_batch_and_share_inflight_loads(self):
+        await sync_to_async(create_orders)(3)
+        batches = {CustomerLoader: [], OrderItemsLoader: []}
+
+        def recording(loader_class):
+            original = loader_class.abatch_load
+
+            async def abatch_load(self, keys):
+                batches[loader_class].append(sorted(keys))
+                return await original(self, keys)
+            return abatch_load
+
+        query = "{ allOrders { edges { node { customer { name } items { quantity } products { name } } } } }"
+        with mock.patch("crm.loaders.optimize_queryset", unoptimized), \
+                mock.patch.object(CustomerLoader, "abatch_load", recording(CustomerLoader)), \
+                mock.patch.object(OrderItemsLoader, "abatch_load", recording(OrderItemsLoader)):
+            status, payload = await self.post("/graphql/async", query)
+
+        self.assertEqual(status, 200)
+        self.assertNotIn("errors", payload)
+        self.assertEqual(len(payload["data"]["allOrders"]["edges"]), 6)
+        # One batch per loader: six orders share three customers, and the
+        # products of each order reuse the item loads already in flight
+        self.assertEqual([len(keys) for keys in batches[CustomerLoader]], [3])
+        self.assertEqual([len(keys) for keys in batches[OrderItemsLoader]], [6])
+
+    async def test_mutations_run_synchronously(self):
+        status, payload = await self.post(
+            "/graphql/async",
+            'mutation { createProduct(input: {name: "Widget", price: 2.5, stock: 3}) { product { stock } } }',
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["data"]["createProduct"]["product"]["stock"], 3)
+        self.assertTrue(await Product.objects.filter(name="Widget").aexists())
+
+
+class CleanInactiveCustomersTests(TestCase):
+    def setUp(self):
+        product = Product.objects.create(name="Widget", price="2.50", stock=5)
+        self.active = Customer.objects.create(name="Active", email="active@example.com")
+        self.lapsed = Customer.objects.create(name="Lapsed", email="lapsed@example.com")
+        self.never = Customer.objects.create(name="Never", email="never@example.com")
+        for customer, days in ((self.active, 10), (self.active, 500), (self.lapsed, 400)):
+            order = Order.objects.create(customer=customer, total_amount="2.50")
+            order_date = timezone.now() - datetime.timedelta(days=days)
+            Order.objects.filter(pk=order.pk).update(order_date=order_date)
+            OrderItem.objects.create(
+                order=order, product=product, quantity=1, unit_price="2.50", order_date=order_date
+            )
+
+    def clean(self, *args):
+        out = StringIO()
+        call_command("clean_inactive_customers", "--batch-size", "1", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_deletes_nothing(self):
+        self.assertIn("Would delete 2 customers, 1 orders and 1 line items.", self.clean("--dry-run"))
+        self.assertEqual(Customer.objects.count(), 3)
+
+    def test_deletes_inactive_customers_in_batches(self):
+        self.assertIn("Deleted customers: 2 (4 rows", self.clean())
+
+        self.assertQuerySetEqual(Customer.objects.all(), [self.active])
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(OrderItem.objects.count(), 2)
+
+    def test_delete_receivers_still_fire(self):
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance.pk)
+
+        post_delete.connect(receiver, sender=Order)
+        try:
+            self.clean()
+        finally:
+            post_delete.disconnect(receiver, sender=Order)
+
+        self.assertEqual(len(deleted), 1)
+        self.assertQuerySetEqual(Customer.objects.all(), [self.active])
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError("SMTP server down")
+
+
+class FlakyEmailBackend(BaseEmailBackend):
+    """Refuses mail to the addresses in ``down``, delivers the rest."""
+    down = set()
+
+    def send_messages(self, email_messages):
+        if any(address in self.down for message in email_messages for address in message.to):
+            raise ConnectionRefusedError("Mailbox unavailable")
+        mail.outbox.extend(email_messages)
+        return len(email_messages)
+
+
+class OrderRemindersTests(TestCase):
+    def setUp(self):
+        self.alice = Customer.objects.create(name="Alice", email="alice@example.com")
+        self.bob = Customer.objects.create(name="Bob", email="bob@example.com")
+        self.place(self.alice)
+        self.place(self.alice)
+        self.place(self.bob)
+        old = self.place(self.bob)
+        Order.objects.filter(pk=old.pk).update(order_date=timezone.now() - datetime.timedelta(days=30))
+
+    def place(self, customer):
+        return Order.objects.create(customer=customer, total_amount="10.00")
+
+    def test_one_reminder_per_customer_and_only_new_orders_on_rerun(self):
+        summary = send_order_reminders()
+
+        self.assertEqual((summary["orders"], summary["customers"], summary["sent"]), (3, 2, 2))
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox), ["alice@example.com", "bob@example.com"]
+        )
+        alice_email = next(message for message in mail.outbox if message.to == ["alice@example.com"])
+        self.assertEqual(alice_email.body.count("Order #"), 2)
+
+        self.assertEqual(send_order_reminders()["sent"], 0)
+        latest = self.place(self.bob)
+        self.assertEqual(send_order_reminders()["sent"], 1)
+        self.assertEqual(mail.outbox[-1].to, ["bob@example.com"])
+        self.assertEqual(JobCursor.objects.get(name=REMINDER_CURSOR).position, latest.pk)
+
+    @override_settings(CRM_REMINDER_EMAIL_BACKEND="crm.tests.FailingEmailBackend")
+    def test_failed_sends_are_retried(self):
+        with self.assertLogs("crm.reminders", "ERROR"):
+            summary = send_order_reminders()
+
+        self.assertEqual((summary["sent"], summary["failed"]), (0, 2))
+        first_order = Order.objects.order_by("id").first()
+        self.assertEqual(JobCursor.objects.get(name=REMINDER_CURSOR).position, first_order.pk - 1)
+
+    @override_settings(CRM_REMINDER_EMAIL_BACKEND="crm.tests.FlakyEmailBackend",
+                       CRM_REMINDER_BATCH_SIZE=1)
+    def test_partial_failure_resends_only_the_failed_orders(self):
+        # Alice's orders come first, so the cursor is held before Bob's too
+        with mock.patch.object(FlakyEmailBackend, "down", {"alice@example.com"}), \
+                self.assertLogs("crm.reminders", "ERROR"):
+            summary = send_order_reminders()
+        self.assertEqual((summary["sent"], summary["failed"]), (1, 1))
+        self.assertEqual([message.to for message in mail.outbox], [["bob@example.com"]])
+
+        summary = send_order_reminders()
+
+        self.assertEqual((summary["orders"], summary["sent"], summary["failed"]), (2, 1, 0))
+        self.assertEqual([message.to for message in mail.outbox],
+                         [["bob@example.com"], ["alice@example.com"]])
+        self.assertEqual(send_order_reminders()["sent"], 0)
+
+
+class BenchmarkCommandsTests(TestCase):
+    def test_generated_data_is_consistent_and_benchmarks_run(self):
+        call_command(
+            "generate_crm_data", "--customers", "20", "--products", "10", "--orders", "50",
+            "--batch-size", "16", stdout=StringIO(),
+        )
+
+        self.assertEqual(Order.objects.count(), 50)
+        for order in Order.objects.prefetch_related("items"):
+            items = list(order.items.all())
+            self.assertEqual(order.item_count, len(items))
+            self.assertEqual(order.unit_count, sum(item.quantity for item in items))
+            self.assertEqual(order.total_amount, sum(item.line_total for item in items))
+        # New orders continue after the explicit ids
+        self.assertEqual(Order.objects.create(customer=Customer.objects.first(), total_amount=1).pk, 51)
+
+        Product.objects.update(stock=100)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            call_command(
+                "benchmark_graphql", "--repeat", "1", "--warmup", "0", "--batch", "3", "--depth", "1",
+                "--output", path, stdout=StringIO(),
+            )
+            with open(path) as f:
+                report = json.load(f)
+            call_command(
+                "benchmark_graphql", "--repeat", "1", "--warmup", "0", "--batch", "3", "--depth", "1",
+                "--compare", path, stdout=StringIO(),
+            )
+
+        self.assertEqual(len(report["scenarios"]), 5)
+        self.assertEqual(Customer.objects.count(), 20)
+        self.assertTrue(all(row["queries"] > 0 for row in report["scenarios"].values()))
+
+
+class QueryOptimizerTests(TestCase):
+    def setUp(self):
+        customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        product = Product.objects.create(name="Widget", price="2.50", stock=5)
+        for _ in range(3):
+            order = Order.objects.create(customer=customer, total_amount="5.00")
+            OrderItem.objects.create(
+                order=order, product=product, quantity=2, unit_price="2.50",
+                order_date=order.order_date,
+            )
+
+    def execute(self, query):
+        with CaptureQueriesContext(connection) as captured:
+            result = schema.execute(query)
+        self.assertIsNone(result.errors)
+        return result.data, [query["sql"] for query in captured]
+
+    def test_selects_only_requested_columns(self):
+        data, [sql] = self.execute("{ allOrders(first: 2) { edges { node { totalAmount } } } }")
+
+        self.assertEqual(len(data["allOrders"]["edges"]), 2)
+        self.assertIn('"crm_order"."total_amount"', sql)
+        self.assertNotIn('"crm_order"."item_count"', sql)
+
+    def test_joins_and_prefetches_selected_relations(self):
+        data, queries = self.execute("""
+            { allOrders { edges { node {
+                customer { name } items { lineTotal product { name } }
+            } } } }
+        """)
+
+        node = data["allOrders"]["edges"][0]["node"]
+        self.assertEqual(node["customer"]["name"], "Alice")
+        self.assertEqual(node["items"], [{"lineTotal": "5.00", "product": {"name": "Widget"}}])
+        # Orders joined with customers, then items joined with products
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"crm_customer"."email"', queries[0])
+        self.assertNotIn('"crm_product"."stock"', queries[1])
+
+
+@override_settings(GRAPHQL_TRACE_HEADER_ENABLED=True, GRAPHQL_RESPONSE_CACHE_FIELDS=())
+class ResolverTracingTests(TestCase):
+    query = "{ allCustomers { edges { node { name orders { totalAmount } } } } }"
+
+    def setUp(self):
+        for i in range(3):
+            customer = Customer.objects.create(name=f"C{i}", email=f"c{i}@example.com")
+            Order.objects.create(customer=customer, total_amount="1.00")
+
+    def post(self, **headers):
+        response = self.client.post(
+            "/graphql", json.dumps({"query": self.query}), content_type="application/json", **headers
+        )
+        return json.loads(response.content).get("extensions", {})
+
+    def test_trace_only_with_header(self):
+        self.assertNotIn("tracing", self.post())
+
+        tracing = self.post(HTTP_X_GRAPHQL_TRACE="1")["tracing"]
+        resolvers = {row["path"]: row for row in tracing["resolvers"]}
+        self.assertEqual(resolvers["allCustomers.edges.*.node.orders"]["calls"], 3)
+        # Orders of all three customers are prefetched with the page
+        self.assertEqual(resolvers["allCustomers"]["sqlQueries"], 2)
+        self.assertEqual(resolvers["allCustomers.edges.*.node.orders"]["sqlQueries"], 0)
+        self.assertEqual(tracing["duplicateSql"], [])
+        self.assertEqual(tracing["sqlQueries"], sum(row["sqlQueries"] for row in tracing["resolvers"]))
+
+    def test_flags_repeated_statements(self):
+        tracer = ResolverTracer(expose=True)
+        with tracer.capture():
+            for customer in Customer.objects.all():
+                list(customer.orders.all())
+
+        [duplicate] = tracer.as_extension()["duplicateSql"]
+        self.assertEqual(duplicate["count"], 3)
+        self.assertEqual(duplicate["paths"], ["(outside resolvers)"])
+
+
+job_release = threading.Event()
+
+
+def blocking_job():
+    job_release.wait(5)
+
+
+def failing_job():
+    raise RuntimeError("boom")
+
+
+@override_settings(TIME_ZONE="UTC", CRM_SCHEDULER_JITTER=0)
+class SchedulerTests(TestCase):
+    def test_cron_slots(self):
+        sunday = datetime.datetime(2025, 1, 5, 6, 0, tzinfo=datetime.timezone.utc)
+
+        self.assertEqual(
+            CronSchedule.from_line("0 6 * * mon").next_after(sunday),
+            datetime.datetime(2025, 1, 6, 6, 0, tzinfo=datetime.timezone.utc),
+        )
+        self.assertEqual(
+            CronSchedule.from_line("*/5 * * * *").next_after(sunday),
+            datetime.datetime(2025, 1, 5, 6, 5, tzinfo=datetime.timezone.utc),
+        )
+
+    def test_skips_slots_while_running(self):
+        now = [datetime.datetime(2025, 1, 5, 6, 0, tzinfo=datetime.timezone.utc)]
+        job = ScheduledJob("blocking", "crm.tests.blocking_job", "* * * * *")
+        scheduler = Scheduler([job], now=lambda: now[0])
+        try:
+            with self.assertLogs("crm.scheduler", "WARNING"):
+                for _ in range(2):
+                    now[0] += datetime.timedelta(minutes=1)
+                    scheduler.tick()
+        finally:
+            job_release.set()
+            scheduler.pool.shutdown(wait=True)
+            job_release.clear()
+
+        self.assertEqual((job.runs, job.skipped), (1, 1))
+        self.assertEqual(job.next_run, now[0] + datetime.timedelta(minutes=1))
+
+    def test_records_durations_and_failures(self):
+        job = ScheduledJob("failing", "crm.tests.failing_job", 60)
+        with self.assertLogs("crm.scheduler", "ERROR"):
+            job.run()
+
+        self.assertEqual((job.runs, job.failures), (1, 1))
+        self.assertIsNotNone(job.mean_duration)
+        self.assertFalse(job.running)
+
+
+class JobLogTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "job.log")
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read().splitlines()
+
+    def test_writes_text_lines(self):
+        log = JobLog("test", self.path)
+        log.write("3 products restocked", lines=["A -> 10", "B -> 10"])
+        log.close()
+
+        header, *details = self.read(self.path)
+        self.assertTrue(header.endswith(" - 3 products restocked"))
+        self.assertEqual(details, ["    A -> 10", "    B -> 10"])
+
+    @override_settings(CRM_JOB_LOG_JSON=True, CRM_JOB_LOG_MAX_BYTES=200, CRM_JOB_LOG_BACKUP_COUNT=2)
+    def test_rotates_json_lines(self):
+        log = JobLog("test", self.path)
+        for i in range(10):
+            log.write(f"run {i}", run=i)
+            log.flush()
+        log.close()
+
+        records = [json.loads(line) for line in self.read(self.path)]
+        self.assertEqual(records[-1]["run"], 9)
+        self.assertEqual(records[-1]["job"], "test")
+        self.assertTrue(os.path.exists(f"{self.path}.2"))
+        self.assertFalse(os.path.exists(f"{self.path}.3"))
+        self.assertLessEqual(os.path.getsize(self.path), 200)
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE_FIELDS=("allProducts",))
+class ResponseCacheTests(TestCase):
+    query = "{ allProducts(first: 10) { edges { node { name stock } } } }"
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        self.product = Product.objects.create(name="Widget", price="2.50", stock=5)
+        invalidate_responses()
+
+    def post(self, query=None):
+        response = self.client.post(
+            "/graphql", json.dumps({"query": query or self.query}), content_type="application/json"
+        )
+        return json.loads(response.content)
+
+    def cache_hit(self):
+        return self.post()["extensions"]["responseCache"]["hit"]
+
+    def test_repeated_query_hits(self):
+        first = self.post()
+        second = self.post()
+
+        self.assertFalse(first["extensions"]["responseCache"]["hit"])
+        self.assertTrue(second["extensions"]["responseCache"]["hit"])
+        self.assertEqual(first["data"], second["data"])
+
+    def test_product_writes_invalidate_on_commit(self):
+        writes = {
+            "save": self.product.save,
+            "createProduct": lambda: self.post(
+                'mutation { createProduct(input: {name: "Gadget", price: 1.5}) { product { id } } }'
+            ),
+            "restock_low_stock": lambda: restock_low_stock(threshold=10, amount=1),
+            "reserve_stock": lambda: create_order(self.customer, self.product, 1),
+        }
+        for name, write in writes.items():
+            with self.subTest(name):
+                self.post()
+                self.assertTrue(self.cache_hit())
+                with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                    write()
+                self.assertTrue(callbacks)
+                self.assertFalse(self.cache_hit())
+
+    def test_noop_restock_keeps_entries(self):
+        self.post()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            restock_low_stock(threshold=0, amount=1)
+
+        self.assertEqual(callbacks, [])
+        self.assertTrue(self.cache_hit())
+
+    def test_rollback_keeps_entries(self):
+        self.post()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                self.product.save()
+                transaction.set_rollback(True)
+
+        self.assertEqual(callbacks, [])
+        self.assertTrue(self.cache_hit())
+
+    @override_settings(GRAPHQL_CACHE_STATS=True)
+    def test_counters_are_reported(self):
+        before = self.post()["extensions"]["cacheStats"]["responses"]
+        after = self.post()["extensions"]["cacheStats"]["responses"]
+
+        self.assertEqual((after["hits"] - before["hits"], after["misses"] - before["misses"]), (1, 0))
+        self.assertGreater(after["hitRatio"], 0)
+
+    def test_other_root_fields_are_not_cached(self):
+        for query in (
+            "{ allCustomers(first: 10) { edges { node { name } } } }",
+            "{ allCustomers(first: 10) { edges { node { name } } } allProducts(first: 1) { totalCount } }",
+        ):
+            with self.subTest(query):
+                self.post(query)
+                self.assertNotIn("responseCache", self.post(query).get("extensions") or {})
+
+
+def clear_document_caches():
+    view = CRMGraphQLView(schema=graphene_settings.SCHEMA)
+    view.get_document_cache().clear()
+    view.get_persisted_queries().clear()
+
+
+class PersistedQueryTests(TestCase):
+    query = "{ hello }"
+
+    def setUp(self):
+        clear_document_caches()
+
+    def post(self, query=None, sha256=None):
+        body = {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": sha256}}}
+        if query is not None:
+            body["query"] = query
+        response = self.client.post("/graphql", json.dumps(body), content_type="application/json")
+        return json.loads(response.content)
+
+    def test_registers_then_runs_by_hash(self):
+        sha256 = hashlib.sha256(self.query.encode()).hexdigest()
+
+        registered = self.post(self.query, sha256)
+        by_hash = self.post(sha256=sha256)
+
+        self.assertEqual(registered["data"], {"hello": "Hello, GraphQL!"})
+        self.assertEqual(by_hash["data"], registered["data"])
+
+    def test_unknown_hash(self):
+        payload = self.post(sha256=hashlib.sha256(b"{ unknown }").hexdigest())
+
+        [error] = payload["errors"]
+        self.assertEqual(error["message"], "PersistedQueryNotFound")
+        self.assertEqual(error["extensions"]["code"], "PERSISTED_QUERY_NOT_FOUND")
+
+    def test_rejects_hash_of_another_query(self):
+        payload = self.post(self.query, hashlib.sha256(b"{ other }").hexdigest())
+
+        self.assertEqual(payload["errors"][0]["message"], "provided sha does not match query")
+        self.assertNotIn("data", payload)
+
+
+class DocumentCacheTests(TestCase):
+    def setUp(self):
+        clear_document_caches()
+
+    def test_identical_documents_skip_parse_and_validate(self):
+        with mock.patch("alx_backend_graphql.views.parse", wraps=parse) as parsed, \
+                mock.patch("alx_backend_graphql.views.validate", wraps=validate) as validated:
+            for _ in range(2):
+                response = self.client.post(
+                    "/graphql", json.dumps({"query": "{ hello }"}), content_type="application/json"
+                )
+                self.assertEqual(json.loads(response.content)["data"], {"hello": "Hello, GraphQL!"})
+
+        self.assertEqual((parsed.call_count, validated.call_count), (1, 1))
+        stats = CRMGraphQLView(schema=graphene_settings.SCHEMA).get_document_cache().stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_counters_are_reported_when_enabled(self):
+        query = json.dumps({"query": "{ hello }"})
+        with override_settings(GRAPHQL_CACHE_STATS=False):
+            response = self.client.post("/graphql", query, content_type="application/json")
+        self.assertNotIn("cacheStats", json.loads(response.content)["extensions"])
+
+        with override_settings(GRAPHQL_CACHE_STATS=True, GRAPHQL_DOCUMENT_CACHE_MAX_ENTRIES=500):
+            response = self.client.post("/graphql", query, content_type="application/json")
+        documents = json.loads(response.content)["extensions"]["cacheStats"]["documents"]
+        self.assertEqual(documents, {"entries": 1, "maxEntries": 500, "hits": 1, "misses": 1})
+
+    def test_evicts_least_recently_used(self):
+        documents = DocumentCache(max_entries=2)
+        documents.set("a", "A")
+        documents.set("b", "B")
+        documents.get("a")
+        documents.set("c", "C")
+
+        self.assertEqual(len(documents), 2)
+        self.assertIsNone(documents.get("b"))
+        self.assertEqual((documents.get("a"), documents.get("c")), ("A", "C"))
+
+
+class QueryCostTests(TestCase):
+    def post(self, query):
+        response = self.client.post(
+            "/graphql", json.dumps({"query": query}), content_type="application/json"
+        )
+        return json.loads(response.content)
+
+    def analyze(self, query, variables=None):
+        document = parse(query)
+        return analyze_query_cost(
+            graphene_settings.SCHEMA.graphql_schema, document, get_operation_ast(document), variables
+        )
+
+    def assert_rejected_without_sql(self, query, message):
+        with self.assertNumQueries(0):
+            payload = self.post(query)
+        [error] = payload["errors"]
+        self.assertIn(message, error["message"])
+        self.assertEqual(error["extensions"]["code"], "QUERY_TOO_COSTLY")
+        self.assertNotIn("data", payload)
+
+    @override_settings(GRAPHQL_MAX_QUERY_DEPTH=3)
+    def test_rejects_deep_queries(self):
+        self.assert_rejected_without_sql(
+            "{ allCustomers(first: 1) { edges { node { name } } } }",
+            "Query depth 4 exceeds the maximum depth of 3.",
+        )
+
+    @override_settings(GRAPHQL_MAX_QUERY_COST=100)
+    def test_rejects_costly_queries(self):
+        # 50 * (connection + edge + node + customer)
+        self.assert_rejected_without_sql(
+            "{ allOrders(first: 50) { edges { node { customer { name } } } } }",
+            "Query cost 200 exceeds the maximum cost of 100.",
+        )
+
+    @override_settings(GRAPHQL_MAX_PAGE_SIZE=10, GRAPHQL_PAGE_SIZE_POLICY="clamp")
+    def test_clamps_page_size_multiplier(self):
+        query_cost, document, _ = self.analyze("{ allOrders(first: 500) { edges { node { id } } } }")
+        # Costed as 10 * (connection + edge + node), and executed with first: 10
+        self.assertEqual(query_cost.cost, 30)
+        self.assertIn("first: 10", print_ast(document))
+
+        query_cost, _, variables = self.analyze(
+            "query Page($n: Int) { allOrders(last: $n) { edges { node { id } } } }", {"n": 500}
+        )
+        self.assertEqual((query_cost.cost, variables), (30, {"n": 10}))
+
+    @override_settings(GRAPHQL_MAX_PAGE_SIZE=10, GRAPHQL_PAGE_SIZE_POLICY="reject")
+    def test_rejects_oversize_pages(self):
+        with self.assertRaisesMessage(QueryCostError, "exceeds the page size limit of 10"):
+            self.analyze("{ allOrders(first: 500) { edges { node { id } } } }")
+
+
+class KeysetPaginationTests(TestCase):
+    page = """
+    query Page($first: Int, $after: String, $last: Int, $before: String) {
+      allCustomers(first: $first, after: $after, last: $last, before: $before) {
+        pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+        edges { node { name } }
+      }
+    }
+    """
+
+    def setUp(self):
+        for i in range(5):
+            Customer.objects.create(name=f"C{i}", email=f"c{i}@example.com")
+        # Tied sort keys: the id breaks the tie
+        Customer.objects.update(created_at=timezone.now())
+
+    def fetch(self, **variables):
+        result = schema.execute(self.page, variable_values=variables)
+        if result.errors:
+            return None, result.errors
+        connection = result.data["allCustomers"]
+        return [edge["node"]["name"] for edge in connection["edges"]], connection["pageInfo"]
+
+    def test_first_after_walks_every_row_once(self):
+        names, pages, after = [], [], None
+        while True:
+            page, info = self.fetch(first=2, after=after)
+            names += page
+            pages.append((info["hasPreviousPage"], info["hasNextPage"]))
+            if not info["hasNextPage"]:
+                break
+            after = info["endCursor"]
+
+        self.assertEqual(names, ["C0", "C1", "C2", "C3", "C4"])
+        self.assertEqual(pages, [(False, True), (True, True), (True, False)])
+
+    def test_last_before_walks_backwards(self):
+        names, pages, before = [], [], None
+        while True:
+            page, info = self.fetch(last=2, before=before)
+            names = page + names
+            pages.append((info["hasPreviousPage"], info["hasNextPage"]))
+            if not info["hasPreviousPage"]:
+                break
+            before = info["startCursor"]
+
+        self.assertEqual(names, ["C0", "C1", "C2", "C3", "C4"])
+        self.assertEqual(pages, [(True, False), (True, True), (False, True)])
+
+    def test_invalid_cursors_are_graphql_errors(self):
+        tampered = [
+            "not a cursor!",
+            base64.urlsafe_b64encode(b"{}").decode(),
+            base64.urlsafe_b64encode(b'["yesterday", 1]').decode(),
+        ]
+        for cursor in tampered:
+            with self.subTest(cursor):
+                response = self.client.post(
+                    "/graphql",
+                    json.dumps({"query": self.page, "variables": {"first": 2, "after": cursor}}),
+                    content_type="application/json",
+                )
+                payload = json.loads(response.content)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNone(payload["data"]["allCustomers"])
+                self.assertEqual(payload["errors"][0]["message"], f"Invalid cursor: {cursor}")
+
+
+class SearchTests(TestCase):
+    # The default backend (FTS5 here) and plain icontains must agree
+    backends = [None, "crm.search.SearchBackend"]
+
+    def setUp(self):
+        self.alice = Customer.objects.create(name="Alice Martin", email="alice@example.com", phone="+15550001")
+        self.bob = Customer.objects.create(name="Bob Alison", email="bob@example.com")
+        self.carol = Customer.objects.create(name="Carol King", email="carol@shop.test", phone="+15550002")
+        Product.objects.create(name="Blue widget holder, deluxe edition", price="9.00", stock=5)
+        Product.objects.create(name="Widget", price="2.50", stock=5)
+        Product.objects.create(name="Gadget", price="4.00", stock=5)
+
+    def names(self, query, root):
+        result = schema.execute(query)
+        self.assertIsNone(result.errors)
+        return [edge["node"]["name"] for edge in result.data[root]["edges"]]
+
+    def customers(self, filters):
+        return self.names(f"{{ allCustomers(first: 10, {filters}) {{ edges {{ node {{ name }} }} }} }}",
+                          "allCustomers")
+
+    def test_contains_filters(self):
+        cases = [
+            ('name: "ali"', ["Alice Martin", "Bob Alison"]),
+            ('name: "bo"', ["Bob Alison"]),  # shorter than a trigram
+            ('email: "SHOP"', ["Carol King"]),
+            ('phone: "5550002"', ["Carol King"]),
+            ('name: "ali", email: "bob@"', ["Bob Alison"]),
+        ]
+        for backend in self.backends:
+            with override_settings(CRM_SEARCH_BACKEND=backend):
+                for filters, expected in cases:
+                    with self.subTest(backend=backend, filters=filters):
+                        self.assertEqual(sorted(self.customers(filters)), expected)
+
+    def test_contains_filter_across_relation(self):
+        product = Product.objects.get(name="Gadget")
+        create_order(self.alice, product, 1)
+        create_order(self.bob, product, 1)
+        query = '{ allOrders(first: 10, customerName: "artin") { edges { node { customer { name } } } } }'
+        for backend in self.backends:
+            with override_settings(CRM_SEARCH_BACKEND=backend), self.subTest(backend=backend):
+                result = schema.execute(query)
+                self.assertIsNone(result.errors)
+                self.assertEqual(
+                    [edge["node"]["customer"]["name"] for edge in result.data["allOrders"]["edges"]],
+                    ["Alice Martin"],
+                )
+
+    def test_search_ranks_best_match_first(self):
+        query = '{ allProducts(first: 10, search: "widget") { edges { node { name } } } }'
+        for backend in self.backends:
+            with override_settings(CRM_SEARCH_BACKEND=backend), self.subTest(backend=backend):
+                self.assertEqual(
+                    self.names(query, "allProducts"), ["Widget", "Blue widget holder, deluxe edition"]
+                )
+
+    def test_search_is_one_ranked_query(self):
+        with self.assertNumQueries(1), CaptureQueriesContext(connection) as queries:
+            results = list(get_search_backend().search(Product.objects.all(), "widget")
+                           .order_by("search_rank", "pk")[:1])
+        self.assertEqual([product.name for product in results], ["Widget"])
+        self.assertNotIn("CASE", queries[0]["sql"])
+
+    def test_search_results_page_by_rank(self):
+        page = """
+        query Page($after: String) {
+          allCustomers(first: 1, after: $after, search: "ali") {
+            pageInfo { hasNextPage endCursor }
+            edges { node { name } }
+          }
+        }
+        """
+        for backend in self.backends:
+            with override_settings(CRM_SEARCH_BACKEND=backend), self.subTest(backend=backend):
+                everything = self.customers('search: "ali"')
+                names, after = [], None
+                while True:
+                    result = schema.execute(page, variable_values={"after": after})
+                    self.assertIsNone(result.errors)
+                    customers = result.data["allCustomers"]
+                    names += [edge["node"]["name"] for edge in customers["edges"]]
+                    if not customers["pageInfo"]["hasNextPage"]:
+                        break
+                    after = customers["pageInfo"]["endCursor"]
+                self.assertEqual(names, everything)
+                self.assertEqual(sorted(names), ["Alice Martin", "Bob Alison"])
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 triggers are SQLite only")
+    def test_only_indexed_columns_trigger_reindexing(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_fts_au'"
+            )
+            triggers = dict(cursor.fetchall())
+        self.assertIn("AFTER UPDATE OF name, email, phone ON crm_customer", triggers["crm_customer_fts_au"])
+        self.assertIn("AFTER UPDATE OF name ON crm_product", triggers["crm_product_fts_au"])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.bob.name = "Robert Stone"
+        self.bob.save()
+        self.carol.delete()
+        self.assertEqual(self.customers('search: "ali"'), ["Alice Martin"])
+        self.assertEqual(self.customers('name: "stone"'), ["Robert Stone"])
+        self.assertEqual(self.customers('email: "shop"'), [])
+
+
+@override_settings(CRM_EXPORT_CHUNK_SIZE=2)
+class ExportOrdersTests(TestCase):
+    def setUp(self):
+        alice = Customer.objects.create(name="Alice", email="alice@example.com")
+        bob = Customer.objects.create(name="Bob", email="bob@example.com")
+        widget = Product.objects.create(name="Widget", price="2.50", stock=100)
+        gadget = Product.objects.create(name="Gadget", price="40.00", stock=100)
+        create_order(alice, widget, 2)
+        create_order(bob, gadget, 3)
+        create_order(alice, gadget, 1)
+        self.user = User.objects.create_user("staff")
+        self.user.user_permissions.add(
+            *Permission.objects.filter(codename__in=["view_order", "view_customer"])
+        )
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get("/export/orders", params)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return response, list(response.streaming_content)
+
+    def test_ndjson_streams_one_chunk_per_batch_of_orders(self):
+        response, chunks = self.export()
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        # Three orders at two per chunk
+        self.assertEqual([chunk.count(b"\n") for chunk in chunks], [2, 1])
+        orders = [json.loads(line) for line in b"".join(chunks).splitlines()]
+        self.assertEqual([order["customer"]["name"] for order in orders], ["Alice", "Bob", "Alice"])
+        self.assertEqual(orders[0]["totalAmount"], "5.00")
+        self.assertEqual(
+            [(product["name"], product["quantity"]) for product in orders[1]["products"]],
+            [("Gadget", 3)],
+        )
+
+    def test_orders_are_read_as_the_response_is_consumed(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/export/orders")
+        self.assertFalse([query for query in queries if "crm_order" in query["sql"]])
+        content = iter(response.streaming_content)
+        # The order query runs once and is read from its cursor chunk by
+        # chunk; every chunk adds one line item query
+        with self.assertNumQueries(2):
+            next(content)
+        with self.assertNumQueries(1):
+            next(content)
+
+    def test_csv(self):
+        response, chunks = self.export(format="csv")
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="orders.csv"')
+        self.assertEqual(len(chunks), 3)  # header, then two chunks of orders
+        rows = list(csv.reader(b"".join(chunks).decode().splitlines()))
+        self.assertEqual(rows[0][:3], ["id", "order_date", "total_amount"])
+        self.assertEqual([(row[2], row[4], row[7], row[8]) for row in rows[1:]], [
+            ("5.00", "Alice", "Widget", "2"),
+            ("120.00", "Bob", "Gadget", "3"),
+            ("40.00", "Alice", "Gadget", "1"),
+        ])
+
+    def test_filters(self):
+        _, chunks = self.export(customer_name="ali", min_total="10")
+        orders = [json.loads(line) for line in b"".join(chunks).splitlines()]
+        self.assertEqual([order["totalAmount"] for order in orders], ["40.00"])
+
+    def test_requires_permission_to_view_orders_and_customers(self):
+        self.client.logout()
+        self.assertEqual(self.client.get("/export/orders").status_code, 403)
+
+        self.user.user_permissions.remove(Permission.objects.get(codename="view_customer"))
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get("/export/orders").status_code, 403)
+
+    def test_invalid_parameters(self):
+        for params in ({"format": "xml"}, {"min_total": "lots"}):
+            with self.subTest(params):
+                response = self.client.get("/export/orders", params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("errors", response.json())
+
+
+class OrderItemMigrationTests(TransactionTestCase):
+    before = [("crm", "0003_search_indexes")]
+    after = [("crm", "0004_orderitem")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_links_become_single_unit_items_priced_at_migration_time(self):
+        apps = self.migrate(self.before)
+        OldCustomer = apps.get_model("crm", "Customer")
+        OldOrder = apps.get_model("crm", "Order")
+        OldProduct = apps.get_model("crm", "Product")
+        customer = OldCustomer.objects.create(name="Alice", email="alice@example.com")
+        widget = OldProduct.objects.create(name="Widget", price="2.50", stock=1)
+        gadget = OldProduct.objects.create(name="Gadget", price="40.00", stock=1)
+        placed = timezone.now() - datetime.timedelta(days=3)
+        order = OldOrder.objects.create(customer=customer, total_amount="42.50")
+        OldOrder.objects.filter(pk=order.pk).update(order_date=placed)
+        order.products.set([widget, gadget])
+
+        apps = self.migrate(self.after)
+        Item = apps.get_model("crm", "OrderItem")
+        items = Item.objects.filter(order_id=order.pk).order_by("product__name")
+        self.assertEqual(
+            [(item.product.name, item.quantity, str(item.unit_price), item.order_date) for item in items],
+            [("Gadget", 1, "40.00", placed), ("Widget", 1, "2.50", placed)],
+        )
+        migrated = apps.get_model("crm", "Order").objects.get(pk=order.pk)
+        self.assertEqual((migrated.item_count, migrated.unit_count), (2, 2))
+
+
+class CrmStatsTests(TestCase):
+    query = """
+    query Stats($start: DateTime, $end: DateTime, $interval: StatsInterval!) {
+      crmStats(start: $start, end: $end) {
+        customerCount orderCount revenue
+        breakdown(interval: $interval) { period orderCount revenue }
+      }
+    }
+    """
+
+    def setUp(self):
+        alice = Customer.objects.create(name="Alice", email="alice@example.com")
+        Customer.objects.create(name="Bob", email="bob@example.com")
+        Customer.objects.filter(pk=alice.pk).update(created_at=self.at(3, 1))
+        # Monday 2 March, Wednesday 4 March and the following Monday
+        for when, total in [(self.at(2, 10), "10.50"), (self.at(2, 15), "20.25"),
+                            (self.at(4, 9), "5.00"), (self.at(9, 0), "100.00")]:
+            order = Order.objects.create(customer=alice, total_amount=total)
+            Order.objects.filter(pk=order.pk).update(order_date=when)
+
+    @staticmethod
+    def at(day, hour):
+        return datetime.datetime(2026, 3, day, hour, tzinfo=datetime.timezone.utc)
+
+    def stats(self, interval="DAY", start=None, end=None):
+        variables = {"interval": interval}
+        if start:
+            variables["start"] = start.isoformat()
+        if end:
+            variables["end"] = end.isoformat()
+        result = schema.execute(self.query, variable_values=variables)
+        self.assertIsNone(result.errors)
+        return result.data["crmStats"]
+
+    def test_window_includes_start_and_excludes_end(self):
+        stats = self.stats(start=self.at(2, 10), end=self.at(9, 0))
+
+        self.assertEqual((stats["customerCount"], stats["orderCount"], stats["revenue"]), (1, 3, "35.75"))
+        self.assertEqual(
+            [(row["period"], row["orderCount"], row["revenue"]) for row in stats["breakdown"]],
+            [("2026-03-02T00:00:00+00:00", 2, "30.75"), ("2026-03-04T00:00:00+00:00", 1, "5.00")],
+        )
+
+    def test_weekly_breakdown(self):
+        stats = self.stats("WEEK")
+
+        self.assertEqual((stats["orderCount"], stats["revenue"]), (4, "135.75"))
+        self.assertEqual(
+            [(row["period"], row["orderCount"], row["revenue"]) for row in stats["breakdown"]],
+            [("2026-03-02T00:00:00+00:00", 3, "35.75"), ("2026-03-09T00:00:00+00:00", 1, "100.00")],
+        )
+
+    def test_empty_window(self):
+        stats = self.stats(start=self.at(20, 0))
+
+        self.assertEqual((stats["orderCount"], stats["revenue"], stats["breakdown"]), (0, "0.00", []))
+        revenue = crm_stats(start=self.at(20, 0))["revenue"]
+        self.assertEqual((revenue, revenue.as_tuple().exponent), (Decimal("0.00"), -2))
+
+
+class TopProductsTests(TestCase):
+    query = """
+    query Top($by: SalesRanking) {
+      crmStats { topProducts(by: $by) { product { name } unitsSold revenue orderCount } }
+    }
+    """
+
+    def setUp(self):
+        alice = Customer.objects.create(name="Alice", email="alice@example.com")
+        widget = Product.objects.create(name="Widget", price="2.00", stock=100)
+        gadget = Product.objects.create(name="Gadget", price="50.00", stock=100)
+        create_order(alice, widget, 10)
+        create_order(alice, widget, 5)
+        create_order(alice, gadget, 1)
+        # Line items keep the price they were sold at
+        Product.objects.filter(pk=gadget.pk).update(price="1.00")
+
+    def top(self, by):
+        result = schema.execute(self.query, variable_values={"by": by})
+        self.assertIsNone(result.errors)
+        return [
+            (row["product"]["name"], row["unitsSold"], row["revenue"], row["orderCount"])
+            for row in result.data["crmStats"]["topProducts"]
+        ]
+
+    def test_by_revenue(self):
+        self.assertEqual(self.top("REVENUE"), [("Gadget", 1, "50.00", 1), ("Widget", 15, "30.00", 2)])
+
+    def test_by_units_sold(self):
+        self.assertEqual(self.top("UNITS_SOLD"), [("Widget", 15, "30.00", 2), ("Gadget", 1, "50.00", 1)])
+
+
+class ExecutorTests(TestCase):
+    def test_local_executor_runs_against_the_served_schema(self):
+        Product.objects.create(name="Widget", price="2.50", stock=1)
+        local = LocalExecutor()
+
+        self.assertEqual(local.execute(JobDocument("{ hello }")), {"hello": "Hello, GraphQL!"})
+        data = local.execute(
+            "mutation Restock($amount: Int) { updateLowStockProducts(amount: $amount) "
+            "{ updatedProducts { name stock } } }",
+            variable_values={"amount": 5},
+        )
+        self.assertEqual(data["updateLowStockProducts"]["updatedProducts"], [{"name": "Widget", "stock": 6}])
+        with self.assertRaisesMessage(GraphQLExecutionError, "Restock amount must be positive."):
+            local.execute("mutation { updateLowStockProducts(amount: 0) { message } }")
+
+    def test_transport_setting_picks_the_executor(self):
+        with override_settings(CRM_GRAPHQL_TRANSPORT="local"):
+            self.assertIsInstance(get_executor(), LocalExecutor)
+        with override_settings(CRM_GRAPHQL_TRANSPORT="http", CRM_GRAPHQL_URL="http://crm.test/graphql"):
+            http = get_executor()
+            self.assertIsInstance(http, HTTPExecutor)
+            self.assertEqual(http.url, "http://crm.test/graphql")
+        with override_settings(CRM_GRAPHQL_TRANSPORT="carrier pigeon"), self.assertRaises(ValueError):
+            get_executor()
+
+
+class JobSchemaCacheTests(TestCase):
+    url = "http://crm.test/graphql"
+
+    def setUp(self):
+        executor.get_http_session.cache_clear()
+        self.addCleanup(executor.get_http_session.cache_clear)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = os.path.join(directory.name, "introspection.json")
+        self.client_class = mock.patch("gql.Client").start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_job_documents_are_checked_when_created(self):
+        with self.assertRaises(GraphQLSyntaxError):
+            JobDocument("{ hello ")
+        # Checked against crm/schema.graphql, i.e. when the job module is imported
+        with self.assertRaisesMessage(GraphQLExecutionError, "Cannot query field 'nope'"):
+            JobDocument("{ nope }")
+
+    def session(self):
+        with override_settings(CRM_GRAPHQL_SCHEMA_CACHE=self.cache):
+            return executor.get_http_session(self.url)
+
+    def client_kwargs(self):
+        return {name: value for name, value in self.client_class.call_args.kwargs.items() if name != "transport"}
+
+    def test_uses_the_checked_in_sdl(self):
+        self.assertIs(self.session(), executor.get_http_session(self.url))
+        self.assertEqual(self.client_kwargs(), {"schema": executor.SCHEMA_SDL_PATH.read_text()})
+        self.client_class.assert_called_once()
+
+    def test_without_sdl_introspects_once_and_caches_on_disk(self):
+        mock.patch.object(executor, "SCHEMA_SDL_PATH", executor.SCHEMA_SDL_PATH.with_name("missing")).start()
+        self.client_class.return_value.introspection = {"__schema": {"types": []}}
+
+        self.session()
+        self.assertEqual(self.client_kwargs(), {"fetch_schema_from_transport": True})
+
+        executor.get_http_session.cache_clear()
+        self.session()
+        self.assertEqual(self.client_kwargs(), {"introspection": {"__schema": {"types": []}}})
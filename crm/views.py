@@ -1,3 +1,124 @@
-from django.shortcuts import render
+import csv
+from itertools import islice
 
-# Create your views here.
+from django.conf import settings
+from django.contrib.auth.decorators import permission_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .models import Order, OrderItem
+from .schema import OrderFilter
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+CSV_COLUMNS = [
+    "id", "order_date", "total_amount",
+    "customer_id", "customer_name", "customer_email",
+    "product_ids", "product_names", "quantities",
+]
+
+
+class Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_order_chunks(queryset, chunk_size):
+    """Yield lists of order dicts with their products, ``chunk_size`` at a time.
+
+    Orders come from a server-side cursor and each chunk's line items are
+    fetched with one query, so memory is bounded by the chunk size rather
+    than by the export size.
+    """
+    rows = queryset.values(
+        "id", "order_date", "total_amount",
+        "customer_id", "customer__name", "customer__email",
+    ).order_by("id").iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        products = {row["id"]: [] for row in chunk}
+        items = OrderItem.objects.filter(order_id__in=products).order_by("order_id", "product_id")
+        for order_id, product_id, name, quantity, unit_price in items.values_list(
+            "order_id", "product_id", "product__name", "quantity", "unit_price"
+        ):
+            products[order_id].append(
+                {"id": product_id, "name": name, "quantity": quantity, "unitPrice": unit_price}
+            )
+        for row in chunk:
+            row["products"] = products[row["id"]]
+        yield chunk
+
+
+def ndjson_lines(chunks):
+    encoder = DjangoJSONEncoder()
+    for chunk in chunks:
+        yield "".join(
+            encoder.encode({
+                "id": row["id"],
+                "orderDate": row["order_date"].isoformat(),
+                "totalAmount": row["total_amount"],
+                "customer": {
+                    "id": row["customer_id"],
+                    "name": row["customer__name"],
+                    "email": row["customer__email"],
+                },
+                "products": row["products"],
+            }) + "\n"
+            for row in chunk
+        )
+
+
+def csv_lines(chunks):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for chunk in chunks:
+        yield "".join(
+            writer.writerow([
+                row["id"],
+                row["order_date"].isoformat(),
+                row["total_amount"],
+                row["customer_id"],
+                row["customer__name"],
+                row["customer__email"],
+                ";".join(str(product["id"]) for product in row["products"]),
+                ";".join(product["name"] for product in row["products"]),
+                ";".join(str(product["quantity"]) for product in row["products"]),
+            ])
+            for row in chunk
+        )
+
+
+@require_GET
+@permission_required(("crm.view_order", "crm.view_customer"), raise_exception=True)
+def export_orders(request):
+    """Stream every order matching the ``allOrders`` filters as NDJSON or CSV.
+
+    Takes the ``OrderFilter`` arguments as query parameters in snake case,
+    e.g. ``/export/orders?format=csv&customer_name=alice&min_total=100``.
+    The export includes customer names and emails, so it is refused (403)
+    unless the user may view both orders and customers.
+    """
+    export_format = request.GET.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse(
+            {"errors": {"format": [f"Choose one of: {', '.join(EXPORT_FORMATS)}."]}}, status=400
+        )
+
+    filterset = OrderFilter(request.GET, queryset=Order.objects.all())
+    if not filterset.is_valid():
+        return JsonResponse({"errors": filterset.errors}, status=400)
+
+    chunk_size = getattr(settings, "CRM_EXPORT_CHUNK_SIZE", 2000)
+    chunks = iter_order_chunks(filterset.qs, chunk_size)
+    if export_format == "csv":
+        response = StreamingHttpResponse(csv_lines(chunks), content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="orders.csv"'
+    else:
+        response = StreamingHttpResponse(ndjson_lines(chunks), content_type="application/x-ndjson")
+    return response